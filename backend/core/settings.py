@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 MIDDLEWARE = [
@@ -143,6 +144,66 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Дисковый LRU-кэш рендеров, запрошенных через ?w=&h=&fmt=.
+# Лежит вне MEDIA_ROOT, чтобы рендеры не отдавались как обычные медиафайлы
+MEDIA_CACHE_ROOT = env('MEDIA_CACHE_ROOT', default=os.path.join(BASE_DIR, 'media_cache'))
+MEDIA_CACHE_MAX_BYTES = env.int('MEDIA_CACHE_MAX_BYTES', default=512 * 1024 * 1024)
+# Максимальная ширина/высота рендера на лету; запрошенный размер
+# округляется вверх до ширины/высоты одного из IMAGE_VARIANTS
+MEDIA_RESIZE_MAX = env.int('MEDIA_RESIZE_MAX', default=2400)
+# Файлы не перезаписываются под тем же именем, поэтому их можно кэшировать навсегда
+MEDIA_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Передача отдачи файлов веб-серверу: '' (отдает Django), nginx (X-Accel-Redirect) или sendfile (X-Sendfile)
+MEDIA_OFFLOAD = env('MEDIA_OFFLOAD', default='')
+# internal-location nginx, указывающий на MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = env('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# internal-location nginx, указывающий на MEDIA_CACHE_ROOT
+MEDIA_CACHE_ACCEL_PREFIX = env('MEDIA_CACHE_ACCEL_PREFIX', default='/protected-media-cache/')
+
+# Варианты размеров, которые готовятся для каждого изображения:
+# имя -> (максимальная ширина, максимальная высота)
+IMAGE_VARIANTS = {
+    'thumb': (320, 240),
+    'card': (640, 480),
+    'full': (1200, 800),
+    '2x': (2400, 1600),
+}
+
+# Дополнительные форматы, в которые перекодируется каждое изображение.
+# Неподдерживаемые текущей сборкой Pillow форматы пропускаются.
+IMAGE_FORMATS = env.list('IMAGE_FORMATS', default=['webp', 'avif'])
+
+# Обработка загруженных изображений:
+# sync — в потоке запроса, queue — через фоновую очередь заданий в БД
+IMAGE_PROCESSING_MODE = env('IMAGE_PROCESSING_MODE', default='sync')
+# Число потоков-воркеров очереди в каждом процессе
+IMAGE_WORKERS = env.int('IMAGE_WORKERS', default=2)
+
+# Обработка файлов одной загрузки: serial, thread (пул потоков) или process (пул процессов)
+IMAGE_UPLOAD_EXECUTOR = env('IMAGE_UPLOAD_EXECUTOR', default='serial')
+# Сколько файлов одной загрузки обрабатываются одновременно
+IMAGE_UPLOAD_WORKERS = env.int('IMAGE_UPLOAD_WORKERS', default=4)
+# Общий предел одновременно обрабатываемых изображений в процессе
+IMAGE_MAX_CONCURRENCY = env.int('IMAGE_MAX_CONCURRENCY', default=8)
+
+# Размер страницы списка мест и верхняя граница для параметра page_size
+PLACES_PAGE_SIZE = env.int('PLACES_PAGE_SIZE', default=20)
+PLACES_MAX_PAGE_SIZE = env.int('PLACES_MAX_PAGE_SIZE', default=100)
+# Максимум операций в одном запросе /api/places/batch/
+PLACES_BATCH_MAX_OPERATIONS = env.int('PLACES_BATCH_MAX_OPERATIONS', default=100)
+# Список мест собирается через values() без сериализаторов DRF
+PLACES_FAST_LIST = env.bool('PLACES_FAST_LIST', default=True)
+
+# Кэш ответов списка и карточки мест: любой URL кэша django-environ,
+# например locmemcache://, filecache:///var/tmp/places или redis://host:6379/1
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
+    'places': env.cache_url('PLACES_CACHE_URL', default='locmemcache://places'),
+}
+PLACES_CACHE_ALIAS = 'places'
+# Старые версии ответов не запрашиваются, тайм-аут лишь ограничивает их жизнь в кэше
+PLACES_CACHE_TIMEOUT = env.int('PLACES_CACHE_TIMEOUT', default=3600)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -14,18 +14,17 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from places.media import serve_media
 
 urlpatterns = [
     path('', RedirectView.as_view(url='/api/', permanent=False)),  # Перенаправление с корневого URL на /api/
     path('admin/', admin.site.urls),  # Админка Django
     path('api/', include('places.urls')),  # API для фронтенда
+    # Медиафайлы: ETag, Range, изменение размера на лету и передача отдачи веб-серверу
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media),
 ]
-
-# Добавляем обработку медиафайлов в режиме разработки
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
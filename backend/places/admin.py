@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Place, PlaceImage
+from .models import Place, PlaceImage, ImageJob, ImageBlob
 
 class PlaceImageInline(admin.TabularInline):
     model = PlaceImage
@@ -18,7 +18,21 @@ class PlaceAdmin(admin.ModelAdmin):
 @admin.register(PlaceImage)
 class PlaceImageAdmin(admin.ModelAdmin):
     """Админка для изображений мест."""
-    list_display = ('place', 'order', 'created_at')
-    list_filter = ('place', 'created_at')
+    list_display = ('place', 'order', 'status', 'created_at')
+    list_filter = ('place', 'status', 'created_at')
     search_fields = ('place__name',)
     readonly_fields = ('created_at',)
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    """Админка для заданий обработки изображений."""
+    list_display = ('id', 'image', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    """Админка для общих файлов изображений."""
+    list_display = ('content_hash', 'ref_count', 'width', 'height', 'created_at')
+    search_fields = ('content_hash',)
+    readonly_fields = ('content_hash', 'ref_count', 'created_at')
@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class PlacesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'places'
-    verbose_name = 'Places' 
\ No newline at end of file
+    verbose_name = 'Places' 
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,285 @@
+"""
+Пакетное применение операций над местами (воспроизведение офлайн-очереди клиента).
+
+Пакет применяется целиком или не применяется вовсе: сначала проверяются
+все операции, и только если ошибок нет, изменения записываются в одной
+транзакции — создания через bulk_create, изменения через bulk_update,
+удаления и перестановки изображений одним запросом на вид операции.
+
+Операции:
+    {"op": "create", "temp_id": "...", "data": {...}}
+    {"op": "update", "slug": "..." | "temp_id": "...", "data": {...}}
+    (вместо slug можно передать числовой ID места, как в URL; как и в PUT,
+    data["deleted_image_ids"] удаляет перечисленные изображения места)
+    {"op": "delete", "slug": "..."}
+    {"op": "reorder_images", "slug": "..." | "temp_id": "...", "image_ids": [...]}
+
+Созданные места доступны последующим операциям пакета по temp_id.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+
+from .dates import stay_fields
+from .models import Place, PlaceImage, ProfileStats
+from .response_cache import bump_versions, place_scopes
+from .serializers import PlaceSerializer
+
+OPERATIONS = ('create', 'update', 'delete', 'reorder_images')
+
+
+class BatchError(Exception):
+    """Ошибка в одной операции пакета."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _create_places(places):
+    """Создает места одним bulk_create, подбирая slug одним запросом к БД."""
+    bases = [Place.base_slug(place.name) for place in places]
+    for attempt in range(Place.SLUG_ATTEMPTS):
+        slugs = [Place.random_slug(base) for base in bases] if attempt else Place.allocate_slugs(bases)
+        for place, slug in zip(places, slugs):
+            place.slug = slug
+        try:
+            # Точка сохранения: при гонке за slug повторяем только вставку
+            with transaction.atomic():
+                Place.objects.bulk_create(places)
+            return
+        except IntegrityError:
+            if attempt + 1 == Place.SLUG_ATTEMPTS:
+                raise
+
+
+def _parse_image_ids(value):
+    if not isinstance(value, list) or not value:
+        raise BatchError({'image_ids': 'Ожидается непустой список ID изображений.'})
+    try:
+        image_ids = [int(image_id) for image_id in value]
+    except (TypeError, ValueError):
+        raise BatchError({'image_ids': 'ID изображений должны быть целыми числами.'})
+    if len(set(image_ids)) != len(image_ids):
+        raise BatchError({'image_ids': 'ID изображений повторяются.'})
+    return image_ids
+
+
+def _parse_deleted_image_ids(value):
+    if not isinstance(value, list):
+        raise BatchError({'deleted_image_ids': 'Ожидается список ID изображений.'})
+    try:
+        return {int(image_id) for image_id in value}
+    except (TypeError, ValueError):
+        raise BatchError({'deleted_image_ids': 'ID изображений должны быть целыми числами.'})
+
+
+class Batch:
+    """Проверка и применение одного пакета операций."""
+
+    def __init__(self, operations, context):
+        self.operations = operations
+        self.context = context
+        self.results = [None] * len(operations)
+        self.created = {}      # temp_id -> новое место
+        self.existing = {}     # slug и ID строкой -> место из БД
+        self.updated = {}      # место -> множество измененных полей
+        self.previous_scopes = []
+        self.deleted = []
+        self.reorders = []     # (место, ID изображений)
+        self.image_deletes = {}  # место -> ID удаляемых изображений
+        self.applied = False
+
+    def _target(self, operation):
+        """Место, к которому относится операция: по slug или temp_id из этого пакета."""
+        temp_id = operation.get('temp_id')
+        if operation.get('op') != 'create' and temp_id is not None:
+            if temp_id not in self.created:
+                raise BatchError({'temp_id': f'Место {temp_id} не создается в этом пакете.'})
+            return self.created[temp_id]
+        slug = str(operation.get('slug'))
+        if slug not in self.existing:
+            raise BatchError({'slug': f'Место {slug} не найдено.'})
+        return self.existing[slug]
+
+    def _validate_create(self, index, operation):
+        data = dict(operation.get('data') or {})
+        temp_id = operation.get('temp_id')
+        if temp_id is None or temp_id in self.created:
+            raise BatchError({'temp_id': 'Нужен уникальный в пакете temp_id.'})
+        if not data.get('name'):
+            data['name'] = "Без названия"
+        serializer = PlaceSerializer(data=data, context=self.context)
+        if not serializer.is_valid():
+            raise BatchError(serializer.errors)
+        place = Place(**serializer.validated_data)
+        for field, value in stay_fields(place.dates).items():
+            setattr(place, field, value)
+        self.created[temp_id] = place
+        self.results[index] = {'op': 'create', 'temp_id': temp_id, 'status': status.HTTP_201_CREATED}
+
+    def _validate_update(self, index, operation):
+        place = self._target(operation)
+        data = dict(operation.get('data') or {})
+        deleted_image_ids = _parse_deleted_image_ids(data.pop('deleted_image_ids', []))
+        serializer = PlaceSerializer(place, data=data, partial=True, context=self.context)
+        if not serializer.is_valid():
+            raise BatchError(serializer.errors)
+        # У места, созданного в этом пакете, еще нет изображений
+        if deleted_image_ids and place.pk is not None:
+            self.image_deletes.setdefault(place, set()).update(deleted_image_ids)
+        if place.pk is not None and place not in self.updated:
+            self.previous_scopes.extend(place_scopes(place.slug, place.user_id, place.username))
+        for field, value in serializer.validated_data.items():
+            setattr(place, field, value)
+        for field, value in stay_fields(place.dates).items():
+            setattr(place, field, value)
+        if place.pk is not None:
+            self.updated.setdefault(place, set()).update(serializer.validated_data)
+        self.results[index] = {'op': 'update', 'status': status.HTTP_200_OK, 'place': place}
+
+    def _validate_delete(self, index, operation):
+        place = self._target(operation)
+        if place.pk is None:
+            raise BatchError({'slug': 'Место, созданное в этом же пакете, удалять не нужно.'})
+        self.deleted.append(place)
+        self.results[index] = {'op': 'delete', 'slug': place.slug, 'status': status.HTTP_204_NO_CONTENT}
+
+    def _validate_reorder(self, index, operation):
+        place = self._target(operation)
+        image_ids = _parse_image_ids(operation.get('image_ids'))
+        self.reorders.append((place, image_ids))
+        self.results[index] = {'op': 'reorder_images', 'status': status.HTTP_200_OK, 'place': place, 'image_ids': image_ids}
+
+    def validate(self):
+        """Проверяет все операции. Возвращает True, если ошибок нет."""
+        slugs = {str(operation['slug']) for operation in self.operations
+                 if isinstance(operation, dict) and operation.get('slug')}
+        ids = [int(slug) for slug in slugs if slug.isdigit()]
+        for place in Place.objects.select_for_update().filter(Q(slug__in=slugs) | Q(pk__in=ids)):
+            self.existing[str(place.pk)] = place
+            self.existing[place.slug] = place
+
+        validators = {
+            'create': self._validate_create,
+            'update': self._validate_update,
+            'delete': self._validate_delete,
+            'reorder_images': self._validate_reorder,
+        }
+        valid = True
+        for index, operation in enumerate(self.operations):
+            try:
+                if not isinstance(operation, dict) or operation.get('op') not in validators:
+                    raise BatchError({'op': f"Ожидается одна из операций: {', '.join(OPERATIONS)}."})
+                validators[operation['op']](index, operation)
+            except BatchError as e:
+                valid = False
+                op = operation.get('op') if isinstance(operation, dict) else None
+                self.results[index] = {'op': op, 'status': status.HTTP_400_BAD_REQUEST, 'errors': e.errors}
+
+        # Изображения всех перестановок проверяются одним запросом
+        place_ids = {place.pk for place, _ in self.reorders}
+        owners = dict(PlaceImage.objects.filter(place_id__in=place_ids).values_list('id', 'place_id'))
+        for result in self.results:
+            if result and result['op'] == 'reorder_images' and result['status'] == status.HTTP_200_OK:
+                place = result['place']
+                if place.pk is None or any(owners.get(image_id) != place.pk for image_id in result['image_ids']):
+                    valid = False
+                    result.update(status=status.HTTP_400_BAD_REQUEST, errors={
+                        'image_ids': 'Не все указанные изображения принадлежат данному месту.',
+                    })
+        return valid
+
+    def apply(self):
+        """Записывает проверенные изменения. Вызывается внутри транзакции."""
+        now = timezone.now()
+        scopes = list(self.previous_scopes)
+
+        new_places = list(self.created.values())
+        if new_places:
+            _create_places(new_places)
+
+        if self.updated:
+            fields = {'updated_at', 'start_date', 'end_date', 'dates_display'}
+            for place, changed in self.updated.items():
+                place.updated_at = now
+                fields |= changed
+            Place.objects.bulk_update(list(self.updated), sorted(fields))
+
+        for place, image_ids in self.reorders:
+            PlaceImage.reorder(place.pk, image_ids)
+        if self.reorders:
+            # Места заблокированы в validate(): обложки пересчитываются тем же UPDATE
+            Place.refresh_images({place.pk for place, _ in self.reorders}, updated_at=now)
+
+        # Сводки владельцев: разница по созданным и измененным местам и обложка
+        # после перестановок. Удаления ниже учитывают сигналы мест и изображений
+        changes = [change for place in new_places for change in ProfileStats.place_changes(place)]
+        for place in self.updated:
+            changes.extend(ProfileStats.place_changes(place, place.saved_values()))
+        changes.extend((place.user_id, {}, ('cover_image',), ()) for place, _ in self.reorders)
+        ProfileStats.apply_changes(changes)
+
+        if self.image_deletes:
+            # Как и PUT, удаляем только изображения этого места; чужие и уже
+            # удаленные ID пропускаются. Сигналы изображений пересчитывают
+            # обложку и сводку места и освобождают блобы
+            images = Q()
+            for place, image_ids in self.image_deletes.items():
+                images |= Q(place_id=place.pk, pk__in=image_ids)
+            PlaceImage.objects.filter(images).delete()
+
+        if self.deleted:
+            # Удаление через queryset отправляет сигналы для каждого места и изображения
+            Place.objects.filter(pk__in=[place.pk for place in self.deleted]).delete()
+
+        touched = [*new_places, *self.updated, *(place for place, _ in self.reorders)]
+        for place in touched:
+            scopes.extend(place_scopes(place.slug, place.user_id, place.username))
+        # bulk_create, bulk_update и update не отправляют сигналы
+        bump_versions(list(dict.fromkeys(scopes)))
+        self.applied = True
+
+    def response(self):
+        """Результаты по операциям и соответствие temp_id -> slug."""
+        results = []
+        for index, result in enumerate(self.results):
+            item = {key: value for key, value in result.items() if key != 'place'}
+            item['index'] = index
+            if not self.applied:
+                if result['status'] < 400:
+                    # Операция корректна, но не применена из-за ошибок в других
+                    item['status'] = status.HTTP_424_FAILED_DEPENDENCY
+                results.append(item)
+                continue
+            if 'place' in result:
+                item['slug'] = result['place'].slug
+                item['id'] = result['place'].pk
+            if result['op'] == 'create':
+                place = self.created[result['temp_id']]
+                item['slug'] = place.slug
+                item['id'] = place.pk
+            results.append(item)
+        return {
+            'results': results,
+            'temp_ids': {temp_id: place.slug for temp_id, place in self.created.items()} if self.applied else {},
+        }
+
+
+def apply_batch(operations, context):
+    """Проверяет и применяет пакет. Возвращает (HTTP-статус, тело ответа)."""
+    if not isinstance(operations, list) or not operations:
+        return status.HTTP_400_BAD_REQUEST, {'error': 'Ожидается непустой список operations.'}
+    max_size = getattr(settings, 'PLACES_BATCH_MAX_OPERATIONS', 100)
+    if len(operations) > max_size:
+        return status.HTTP_400_BAD_REQUEST, {'error': f'В пакете не больше {max_size} операций.'}
+
+    with transaction.atomic():
+        batch = Batch(operations, context)
+        if not batch.validate():
+            # Ни одна операция не применяется, если хотя бы одна ошибочна
+            return status.HTTP_400_BAD_REQUEST, batch.response()
+        batch.apply()
+    return status.HTTP_200_OK, batch.response()
@@ -0,0 +1,71 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для списка и карточки мест.
+
+Валидаторы считаются одним агрегирующим запросом по updated_at, без
+сериализации: если клиент прислал совпадающий If-None-Match или
+If-Modified-Since, сразу отдается 304.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Клиент может хранить ответ, но обязан сверять его с сервером
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _make_etag(*parts):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def list_validators(request, queryset):
+    """
+    ETag и время изменения отфильтрованного списка мест.
+    
+    Число строк меняется при удалении, максимум updated_at — при создании
+    и изменении места или его изображений; URL запроса различает страницы
+    и фильтры.
+    """
+    state = queryset.order_by().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    last_modified = state['last_modified']
+    etag = _make_etag(
+        state['count'], last_modified.isoformat() if last_modified else '',
+        request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''),
+    )
+    return etag, last_modified
+
+
+def detail_validators(request, queryset, lookup):
+    """ETag и время изменения одного места или (None, None), если его нет."""
+    state = queryset.order_by().filter(**lookup).values('id', 'updated_at').first()
+    if state is None:
+        return None, None
+    etag = _make_etag(
+        state['id'], state['updated_at'].isoformat(),
+        request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''),
+    )
+    return etag, state['updated_at']
+
+
+def not_modified(request, etag, last_modified):
+    """Возвращает ответ 304 (или 412), если у клиента актуальная версия, иначе None."""
+    if etag is None:
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """Добавляет к ответу валидаторы и Cache-Control."""
+    if etag is None:
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,66 @@
+"""
+Даты пребывания: разбор строки из клиента и русское представление диапазона.
+
+Клиент присылает даты строкой «ДД.ММ.ГГГГ – ДД.ММ.ГГГГ». Разбор и
+форматирование выполняются один раз при сохранении места, а не при
+каждой сериализации.
+"""
+from datetime import datetime
+
+MONTHS_RU = {
+    1: 'янв',
+    2: 'фев',
+    3: 'мар',
+    4: 'апр',
+    5: 'май',
+    6: 'июн',
+    7: 'июл',
+    8: 'авг',
+    9: 'сен',
+    10: 'окт',
+    11: 'ноя',
+    12: 'дек'
+}
+
+
+def parse_stay_dates(dates):
+    """Возвращает (начало, конец) из строки дат или (None, None), если ее не разобрать."""
+    if not dates or '.' not in dates:
+        return None, None
+    parts = dates.split('–')
+    if len(parts) != 2:
+        return None, None
+    try:
+        start_date = datetime.strptime(parts[0].strip(), '%d.%m.%Y').date()
+        end_date = datetime.strptime(parts[1].strip(), '%d.%m.%Y').date()
+    except ValueError:
+        return None, None
+    return start_date, end_date
+
+
+def format_stay_dates(start_date, end_date):
+    """Форматирует диапазон дат по-русски, опуская повторяющиеся месяц и год."""
+    # Если один и тот же месяц
+    if start_date.month == end_date.month and start_date.year == end_date.year:
+        return f"{start_date.day}–{end_date.day} {MONTHS_RU[end_date.month]} {end_date.year}"
+    # Если разные месяцы, но один год
+    if start_date.year == end_date.year:
+        return f"{start_date.day} {MONTHS_RU[start_date.month]} – {end_date.day} {MONTHS_RU[end_date.month]} {end_date.year}"
+    # Если разные годы
+    return (
+        f"{start_date.day} {MONTHS_RU[start_date.month]} {start_date.year} – "
+        f"{end_date.day} {MONTHS_RU[end_date.month]} {end_date.year}"
+    )
+
+
+def stay_fields(dates):
+    """Возвращает значения start_date, end_date и dates_display для строки дат."""
+    start_date, end_date = parse_stay_dates(dates)
+    if start_date is None:
+        # Неразобранная строка показывается как есть
+        return {'start_date': None, 'end_date': None, 'dates_display': dates or ''}
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'dates_display': format_stay_dates(start_date, end_date),
+    }
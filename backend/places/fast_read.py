@@ -0,0 +1,148 @@
+"""
+Быстрый путь чтения списка мест.
+
+Вместо моделей и сериализаторов DRF строки выбираются через values(),
+а JSON той же формы, что у PlaceListSerializer, собирается функциями,
+подготовленными один раз на запрос под выбранный набор полей.
+Обложка хранится в самом месте и приходит тем же запросом, все
+изображения страницы (?expand=images) выбираются одним запросом,
+URL файлов склеиваются из заранее построенного абсолютного префикса.
+"""
+from django.conf import settings
+from django.utils.encoding import filepath_to_uri, iri_to_uri
+from rest_framework import serializers
+
+from .models import PlaceImage
+
+# Подготовленные поля DRF: те же правила форматирования, без интроспекции
+_datetime = serializers.DateTimeField().to_representation
+_date = serializers.DateField().to_representation
+
+# Столбцы Place, которые копируются в ответ как есть
+_PLAIN_FIELDS = (
+    'id', 'user_id', 'username', 'name', 'location', 'rating', 'review', 'pros', 'cons', 'slug', 'image_count',
+)
+
+# Столбцы обложки: выбираются через JOIN по Place.cover_image
+_COVER_COLUMNS = {
+    column: f"cover_image__{column}" for column in ('id', 'image', 'variants', 'placeholder', 'width', 'height')
+}
+_IMAGE_COLUMNS = (
+    'id', 'place_id', 'image', 'order', 'status', 'variants', 'placeholder',
+    'width', 'height', 'file_size', 'taken_at', 'orientation',
+)
+
+
+def place_rows(queryset, fields):
+    """Возвращает queryset словарей со столбцами, нужными для полей fields."""
+    # id и created_at нужны всегда: по ним строится курсор пагинации
+    columns = {'id', 'created_at'}
+    for name in fields:
+        if name in _PLAIN_FIELDS or name in ('start_date', 'end_date', 'updated_at'):
+            columns.add(name)
+        elif name == 'dates':
+            columns.update(('dates', 'dates_display'))
+        elif name == 'cover_image':
+            columns.update(_COVER_COLUMNS.values())
+    return queryset.values(*columns)
+
+
+class _Urls:
+    """Построение URL файлов так же, как это делают сериализаторы изображений."""
+
+    def __init__(self, request):
+        media_url = settings.MEDIA_URL
+        self.base = request.build_absolute_uri(media_url) if request else media_url
+
+    def file(self, name):
+        # Как request.build_absolute_uri(FieldFile.url)
+        return iri_to_uri(self.base + filepath_to_uri(name))
+
+    def raw(self, name):
+        # Как PlaceImageSerializer._build_url
+        return iri_to_uri(self.base + name)
+
+    def variants(self, variants):
+        return {
+            variant_name: {
+                'url': self.raw(variant['name']),
+                'width': variant['width'],
+                'height': variant['height'],
+            }
+            for variant_name, variant in (variants or {}).items()
+        }
+
+    def srcset(self, variants):
+        candidates = {}
+        for variant in (variants or {}).values():
+            candidates[variant['width']] = variant['name']
+        if not candidates:
+            return None
+        return ', '.join(f"{self.raw(name)} {width}w" for width, name in sorted(candidates.items()))
+
+
+def _cover(row, urls):
+    if row[_COVER_COLUMNS['id']] is None:
+        return None
+    cover = {column: row[name] for column, name in _COVER_COLUMNS.items()}
+    return {
+        'id': cover['id'],
+        'image_url': urls.file(cover['image']) if cover['image'] else None,
+        'srcset': urls.srcset(cover['variants']),
+        'placeholder': cover['placeholder'],
+        'width': cover['width'],
+        'height': cover['height'],
+    }
+
+
+def _image(row, urls):
+    url = urls.file(row['image']) if row['image'] else None
+    return {
+        'id': row['id'],
+        'image': url,
+        'order': row['order'],
+        'image_url': url,
+        'status': row['status'],
+        'variants': urls.variants(row['variants']),
+        'srcset': urls.srcset(row['variants']),
+        'placeholder': row['placeholder'],
+        'width': row['width'],
+        'height': row['height'],
+        'file_size': row['file_size'],
+        'taken_at': _datetime(row['taken_at']) if row['taken_at'] else None,
+        'orientation': row['orientation'],
+    }
+
+
+def _getter(name, urls, images):
+    """Возвращает функцию строка -> значение поля name в ответе."""
+    if name in _PLAIN_FIELDS:
+        return lambda row: row[name]
+    if name == 'dates':
+        # Как PlaceSerializer.to_representation: отформатированный диапазон
+        return lambda row: (row['dates_display'] or row['dates']) if row['dates'] else row['dates']
+    if name in ('start_date', 'end_date'):
+        return lambda row: _date(row[name]) if row[name] else None
+    if name in ('created_at', 'updated_at'):
+        return lambda row: _datetime(row[name]) if row[name] else None
+    if name == 'cover_image':
+        return lambda row: _cover(row, urls)
+    if name == 'images':
+        return lambda row: images.get(row['id'], [])
+    raise ValueError(f"Поле {name} не поддерживается быстрым путем")
+
+
+def serialize_places(rows, fields, request):
+    """Собирает представление списка мест из строк place_rows()."""
+    rows = list(rows)
+    ids = [row['id'] for row in rows]
+    urls = _Urls(request)
+
+    images = {}
+    if 'images' in fields and ids:
+        image_rows = PlaceImage.objects.filter(place_id__in=ids).order_by('order', 'id').values(*_IMAGE_COLUMNS)
+        for row in image_rows:
+            images.setdefault(row['place_id'], []).append(_image(row, urls))
+
+    getters = [(name, _getter(name, urls, images)) for name in fields]
+    return [{name: get(row) for name, get in getters} for row in rows]
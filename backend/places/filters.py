@@ -0,0 +1,111 @@
+"""
+Серверная фильтрация списка мест по параметрам запроса.
+
+Каждому фильтру соответствует индекс модели Place, поэтому из БД
+читаются только подходящие строки.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models.functions import Upper
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def _parse_rating(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        rating = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Рейтинг должен быть целым числом'})
+    if not 1 <= rating <= 5:
+        raise ValidationError({name: 'Рейтинг должен быть от 1 до 5'})
+    return rating
+
+
+def _parse_moment(params, name, end_of_day=False):
+    """
+    Разбирает дату или дату со временем в формате ISO 8601.
+    
+    Для даты без времени возвращается начало этого дня, а при end_of_day —
+    начало следующего, чтобы фильтр оставался диапазоном по created_at
+    и использовал индекс.
+    """
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is not None:
+                if end_of_day:
+                    day += timedelta(days=1)
+                moment = datetime.combine(day, time.min)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: 'Ожидается дата в формате ISO 8601'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_day(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: 'Ожидается дата в формате ГГГГ-ММ-ДД'})
+    return day
+
+
+def filter_places(queryset, params):
+    """
+    Применяет фильтры из параметров запроса:
+    user_id, username — владелец места;
+    rating_min, rating_max — диапазон рейтинга;
+    location — локация без учета регистра;
+    created_after, created_before — диапазон даты добавления
+    (дата без времени включает весь день);
+    stay_from, stay_to — места, пребывание в которых пересекается с периодом.
+    """
+    user_id = params.get('user_id')
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+    username = params.get('username')
+    if username:
+        queryset = queryset.filter(username=username)
+
+    rating_min = _parse_rating(params, 'rating_min')
+    if rating_min is not None:
+        queryset = queryset.filter(rating__gte=rating_min)
+    rating_max = _parse_rating(params, 'rating_max')
+    if rating_max is not None:
+        queryset = queryset.filter(rating__lte=rating_max)
+
+    location = params.get('location')
+    if location:
+        # Сравнение по UPPER(location) использует функциональный индекс
+        queryset = queryset.annotate(location_upper=Upper('location')).filter(location_upper=location.upper())
+
+    created_after = _parse_moment(params, 'created_after')
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    created_before = _parse_moment(params, 'created_before', end_of_day=True)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+
+    stay_from = _parse_day(params, 'stay_from')
+    if stay_from is not None:
+        queryset = queryset.filter(end_date__gte=stay_from)
+    stay_to = _parse_day(params, 'stay_to')
+    if stay_to is not None:
+        queryset = queryset.filter(start_date__lte=stay_to)
+    return queryset
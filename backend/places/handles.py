@@ -0,0 +1,63 @@
+"""
+Поиск пользователя по имени из URL профиля.
+
+Фронтенд строит URL из имени пользователя (строчные буквы, пробелы
+заменены дефисами), поэтому профиль ищется и по точному имени, и по
+каноническому имени UserHandle.handle — оба поля проиндексированы.
+Точное совпадение имени важнее канонического.
+
+ID найденного пользователя запоминается в кэше мест (PLACES_CACHE_ALIAS)
+под именем из URL — и для точных, и для канонических совпадений, так что
+повторный запрос того же профиля — поиск по первичному ключу. Найденный
+так пользователь сверяется с именем из URL, поэтому переименование или
+удаление приводит не к чужому профилю, а лишь к одному обычному поиску.
+Сохранение пользователя с новым именем сбрасывает запись под этим именем
+(сигнал sync_user_handle): каноническое совпадение, запомненное раньше,
+не должно победить появившееся точное.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import IntegerField, Value
+
+from .models import UserHandle
+
+
+def _cache():
+    return caches[getattr(settings, 'PLACES_CACHE_ALIAS', 'places')]
+
+
+def _key(value):
+    # Имя может содержать пробелы и любые символы, недопустимые в ключах memcached
+    return f"places:handle:{hashlib.md5(value.encode()).hexdigest()}"
+
+
+def _matches(user, value):
+    return user.username == value or UserHandle.canonical(user.username) == UserHandle.canonical(value)
+
+
+def find_user(queryset, value):
+    """Пользователь из queryset по имени из URL или None. Всегда один запрос."""
+    cache = _cache()
+    key = _key(value)
+    user_id = cache.get(key)
+    if user_id is not None:
+        user = queryset.filter(pk=user_id).first()
+        if user is not None and _matches(user, value):
+            return user
+        cache.delete(key)
+
+    # UNION двух поисков по индексам: OR через JOIN индексы бы не использовал.
+    # Каноническое имя не уникально, поэтому точное совпадение выбирает БД
+    user = queryset.filter(username=value).annotate(inexact=Value(0, IntegerField())).union(
+        queryset.filter(handle__handle=UserHandle.canonical(value)).annotate(inexact=Value(1, IntegerField()))
+    ).order_by('inexact').first()
+    if user is not None:
+        cache.set(key, user.pk, getattr(settings, 'PLACES_CACHE_TIMEOUT', 3600))
+    return user
+
+
+def forget_username(username):
+    """Сбрасывает запись под этим именем: теперь оно совпадает с пользователем точно."""
+    _cache().delete(_key(username))
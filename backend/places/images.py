@@ -0,0 +1,341 @@
+"""
+Обработка изображений мест: исправление ориентации, изменение размера,
+подготовка нескольких вариантов размеров за одно декодирование
+и перекодирование в современные форматы (WebP, AVIF).
+
+Чтобы не раздувать память воркера на больших фотографиях, JPEG сразу
+декодируется в уменьшенном масштабе (draft), уменьшение идет через
+reduce() с последующим LANCZOS, а закодированные байты передаются
+в хранилище одним буфером без промежуточных копий.
+"""
+import base64
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+from django.core.files.base import File
+from PIL import Image, ExifTags, features
+
+# Ключ основной версии изображения среди всех рендеров
+MAIN = None
+
+# Дополнительные форматы: имя -> (формат Pillow, MIME-тип, параметры кодирования).
+# Порядок задает предпочтение при выборе формата по заголовку Accept.
+EXTRA_FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 60}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+}
+
+
+def _apply_exif_orientation(img):
+    """Поворачивает изображение в соответствии с тегом ориентации EXIF."""
+    try:
+        # Получаем EXIF-данные
+        exif = img._getexif()
+        if exif:
+            # Находим тег ориентации
+            for orientation in ExifTags.TAGS.keys():
+                if ExifTags.TAGS[orientation] == 'Orientation':
+                    break
+
+            # Применяем соответствующее преобразование в зависимости от ориентации
+            if orientation in exif:
+                if exif[orientation] == 2:
+                    img = img.transpose(Image.FLIP_LEFT_RIGHT)
+                elif exif[orientation] == 3:
+                    img = img.transpose(Image.ROTATE_180)
+                elif exif[orientation] == 4:
+                    img = img.transpose(Image.FLIP_TOP_BOTTOM)
+                elif exif[orientation] == 5:
+                    img = img.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_90)
+                elif exif[orientation] == 6:
+                    img = img.transpose(Image.ROTATE_270)
+                elif exif[orientation] == 7:
+                    img = img.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_270)
+                elif exif[orientation] == 8:
+                    img = img.transpose(Image.ROTATE_90)
+    except (AttributeError, KeyError, IndexError):
+        # Игнорируем ошибки, если EXIF-данные отсутствуют или повреждены
+        pass
+    return img
+
+
+# Наибольшая сторона превью-заглушки (LQIP), пикселей
+PLACEHOLDER_SIZE = 20
+
+# Теги ориентации EXIF, при которых ширина и высота меняются местами
+_ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Теги EXIF, которые сохраняются в метаданных изображения
+_TAG_ORIENTATION = 0x0112
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_OFFSET_TIME_ORIGINAL = 0x9011
+
+
+def _buffer_file(output, name=None):
+    """Оборачивает буфер в File для хранилища без копирования байтов."""
+    output.seek(0)
+    return File(output, name=name)
+
+
+def content_hash(file):
+    """Возвращает SHA-256 исходных байтов загруженного файла."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _parse_exif_datetime(value, offset=None):
+    """
+    Разбирает дату EXIF вида 'YYYY:MM:DD HH:MM:SS'.
+    
+    EXIF хранит локальное время съемки; если смещение не записано,
+    время считается UTC. Возвращает None для пустых и битых значений.
+    """
+    try:
+        taken_at = datetime.strptime(str(value).strip('\x00 '), '%Y:%m:%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+    tzinfo = timezone.utc
+    if offset:
+        try:
+            sign = -1 if str(offset).startswith('-') else 1
+            hours, minutes = str(offset).lstrip('+-').split(':')
+            tzinfo = timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+        except ValueError:
+            pass
+    return taken_at.replace(tzinfo=tzinfo)
+
+
+def read_metadata(img):
+    """Читает из EXIF дату съемки и ориентацию, не декодируя пиксели."""
+    try:
+        exif = img.getexif()
+        exif_ifd = exif.get_ifd(_TAG_EXIF_IFD)
+    except Exception:
+        # Битые EXIF-данные не должны мешать обработке
+        return {'taken_at': None, 'orientation': None}
+    taken_at = _parse_exif_datetime(
+        exif_ifd.get(_TAG_DATETIME_ORIGINAL) or exif.get(_TAG_DATETIME),
+        exif_ifd.get(_TAG_OFFSET_TIME_ORIGINAL),
+    )
+    orientation = exif.get(_TAG_ORIENTATION)
+    return {
+        'taken_at': taken_at,
+        'orientation': orientation if isinstance(orientation, int) and 1 <= orientation <= 8 else None,
+    }
+
+
+def _encode(img, save_format, quality, name=None):
+    """Кодирует изображение в указанный формат и возвращает File для хранилища."""
+    if save_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    output = BytesIO()
+    img.save(output, format=save_format, quality=quality)
+    return _buffer_file(output, name)
+
+
+def fit_size(size, box):
+    """Возвращает размер, вписанный в рамку с сохранением пропорций (без увеличения)."""
+    ratio = min(box[0] / size[0], box[1] / size[1], 1)
+    return max(1, round(size[0] * ratio)), max(1, round(size[1] * ratio))
+
+
+def _reduce_on_decode(img, sizes):
+    """
+    Просит декодер JPEG сразу уменьшить изображение в 2, 4 или 8 раз,
+    но не меньше самого крупного из нужных рендеров.
+    """
+    width, height = img.size
+    if img.getexif().get(0x0112) in _ROTATED_ORIENTATIONS:
+        # Рамки заданы для уже повернутого изображения
+        width, height = height, width
+    fitted = [fit_size((width, height), box) for box in sizes]
+    target = (max(size[0] for size in fitted), max(size[1] for size in fitted))
+    if (width, height) != img.size:
+        target = (target[1], target[0])
+    img.draft(img.mode, target)
+
+
+def available_formats(requested):
+    """Оставляет из запрошенных дополнительных форматов те, что поддерживает Pillow."""
+    return [fmt for fmt in EXTRA_FORMATS if fmt in requested and features.check(fmt)]
+
+
+def alternate_path(name, fmt):
+    """Возвращает путь файла в дополнительном формате рядом с основным."""
+    return f"{name}.{fmt}"
+
+
+def _encode_alternates(img, formats):
+    """Кодирует изображение во все дополнительные форматы."""
+    alternates = {}
+    for fmt in formats:
+        pillow_format, _, params = EXTRA_FORMATS[fmt]
+        if img.mode not in ('RGB', 'RGBA', 'L'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+        output = BytesIO()
+        img.save(output, format=pillow_format, **params)
+        alternates[fmt] = _buffer_file(output)
+    return alternates
+
+
+def make_placeholder(img, size=PLACEHOLDER_SIZE):
+    """
+    Строит крошечное размытое превью (LQIP) и возвращает его как data URI.
+    
+    Превью встраивается прямо в JSON, поэтому первая отрисовка карточек
+    не требует дополнительных запросов. Лучше передавать уже уменьшенное
+    изображение: тогда уменьшение до заглушки почти ничего не стоит.
+    """
+    preview = img.resize(fit_size(img.size, (size, size)), Image.BILINEAR, reducing_gap=2.0)
+    if preview.mode != 'RGB':
+        preview = preview.convert('RGB')
+    if features.check('webp'):
+        save_format, mime_type = 'WEBP', 'image/webp'
+    else:
+        save_format, mime_type = 'JPEG', 'image/jpeg'
+    output = BytesIO()
+    preview.save(output, format=save_format, quality=40)
+    return f"data:{mime_type};base64,{base64.b64encode(output.getbuffer()).decode('ascii')}"
+
+
+def render_sizes(img, sizes):
+    """
+    Строит рендеры изображения для набора ограничивающих размеров.
+
+    Рендеры считаются каскадом от большего к меньшему: каждый следующий
+    уменьшается из предыдущего, а не из исходника, поэтому исходник
+    декодируется и масштабируется только один раз. Крупные уменьшения
+    сначала выполняются быстрым reduce(), затем LANCZOS.
+    Возвращает словарь ключ -> изображение PIL.
+    """
+    renditions = {}
+    current = img
+    ordered = sorted(sizes.items(), key=lambda item: item[1][0] * item[1][1], reverse=True)
+    for key, size in ordered:
+        if current.width > size[0] or current.height > size[1]:
+            rendition = current.resize(fit_size(current.size, size), Image.LANCZOS, reducing_gap=2.0)
+        else:
+            # Не увеличиваем изображения меньше целевого размера
+            rendition = current
+        renditions[key] = rendition
+        current = rendition
+    return renditions
+
+
+def process_image(image, max_size=(1200, 800), variant_sizes=None, quality=85, formats=(), draft=True):
+    """
+    Обрабатывает загруженное изображение за одно декодирование.
+    
+    При draft=True JPEG декодируется сразу в уменьшенном масштабе.
+
+    Возвращает словарь с основной версией ('main'), вариантами размеров
+    ('variants': имя -> рендер), превью-заглушкой ('placeholder')
+    и метаданными EXIF ('metadata': taken_at, orientation). Каждый рендер описывается словарем
+    {'content', 'width', 'height', 'alternates': формат -> File};
+    у вариантов, совпадающих с основной версией, content равен None.
+    """
+    if not image:
+        return None
+
+    sizes = dict(variant_sizes or {})
+    sizes[MAIN] = max_size
+
+    img = Image.open(image)
+    # Если формат не определен, используем JPEG
+    save_format = img.format or 'JPEG'
+    metadata = read_metadata(img)
+    if draft and img.format == 'JPEG':
+        _reduce_on_decode(img, sizes.values())
+    img = _apply_exif_orientation(img)
+    formats = available_formats(formats)
+
+    renditions = render_sizes(img, sizes)
+    # Освобождаем полноразмерный буфер до кодирования рендеров
+    img = None
+
+    name = os.path.basename(image.name)
+
+    def describe(rendition, encode=True):
+        return {
+            'content': _encode(rendition, save_format, quality, name=name) if encode else None,
+            'width': rendition.width,
+            'height': rendition.height,
+            'alternates': _encode_alternates(rendition, formats) if encode else {},
+        }
+
+    # Заглушку считаем из самого маленького рендера
+    smallest = min(renditions.values(), key=lambda rendition: rendition.width * rendition.height)
+    placeholder = make_placeholder(smallest)
+
+    main = renditions.pop(MAIN)
+    # Вариант совпадает с основной версией — не кодируем его повторно
+    return {
+        'main': describe(main),
+        'placeholder': placeholder,
+        'metadata': metadata,
+        'variants': {
+            variant_name: describe(rendition, encode=rendition.size != main.size)
+            for variant_name, rendition in renditions.items()
+        },
+    }
+
+
+def render_to_box(image, box, fmt=None, quality=85):
+    """
+    Рендерит изображение, вписанное в рамку, для выдачи по запросу.
+
+    fmt — 'jpeg', 'png' или один из EXTRA_FORMATS; по умолчанию формат
+    исходника. Возвращает File с закодированными байтами.
+    """
+    img = Image.open(image)
+    save_format = img.format or 'JPEG'
+    if img.format == 'JPEG':
+        _reduce_on_decode(img, [box])
+    img = _apply_exif_orientation(img)
+    if img.width > box[0] or img.height > box[1]:
+        img = img.resize(fit_size(img.size, box), Image.LANCZOS, reducing_gap=2.0)
+    if fmt in EXTRA_FORMATS:
+        return _encode_alternates(img, [fmt])[fmt]
+    return _encode(img, fmt.upper() if fmt else save_format, quality)
+
+
+def negotiate_format(accept, available):
+    """
+    Выбирает лучший из доступных дополнительных форматов по заголовку Accept.
+
+    Учитываются только явно перечисленные MIME-типы с q > 0: подстановки
+    вроде image/* не гарантируют поддержку AVIF/WebP. Возвращает имя формата
+    или None, если следует отдать основной файл.
+    """
+    accepted = set()
+    for part in (accept or '').split(','):
+        media_type, _, params = part.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(media_type.strip().lower())
+
+    for fmt, (_, mime_type, _) in EXTRA_FORMATS.items():
+        if fmt in available and mime_type in accepted:
+            return fmt
+    return None
+
+
+def variant_path(image_name, variant_name):
+    """Возвращает путь в хранилище для варианта размера изображения."""
+    stem, ext = os.path.splitext(os.path.basename(image_name))
+    return f"places/variants/{stem}_{variant_name}{ext}"
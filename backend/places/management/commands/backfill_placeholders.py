@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from places.images import make_placeholder
+from places.models import ImageBlob, Place, PlaceImage
+
+# width и height нужны smallest_rendition, иначе каждая запись догружается запросом
+RENDITION_FIELDS = ('id', 'image', 'variants', 'width', 'height')
+
+
+class Command(BaseCommand):
+    """Заполняет превью-заглушки для изображений и блобов, загруженных до их появления."""
+    help = 'Строит LQIP-заглушки для изображений и блобов без них'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Размер пакета для bulk_update')
+        parser.add_argument('--force', action='store_true', help='Пересчитать заглушки у всех изображений')
+
+    def _build(self, image):
+        """Строит заглушку по самой маленькой версии; при ошибке возвращает None."""
+        try:
+            # Самая маленькая версия декодируется почти мгновенно, а весь
+            # пересчет до 20 px выполняет Pillow одним проходом по пикселям
+            with image.image.storage.open(image.smallest_rendition()) as source:
+                img = Image.open(source)
+                img.draft('RGB', (64, 64))
+                return make_placeholder(img)
+        except Exception as e:
+            self.stderr.write(f"{image._meta.verbose_name} {image.pk}: {e}")
+            return None
+
+    def _fill(self, records, placeholder_for, save, batch_size):
+        """Заполняет заглушки пакетами; возвращает число обновленных записей."""
+        batch = []
+        updated = 0
+        for record in records.iterator(chunk_size=batch_size):
+            placeholder = placeholder_for(record)
+            if placeholder is None:
+                continue
+            record.placeholder = placeholder
+            batch.append(record)
+            if len(batch) >= batch_size:
+                updated += save(batch)
+                batch = []
+        if batch:
+            updated += save(batch)
+        return updated
+
+    def _save_blobs(self, batch):
+        return ImageBlob.objects.bulk_update(batch, ['placeholder'])
+
+    def _save_images(self, batch):
+        updated = PlaceImage.objects.bulk_update(batch, ['placeholder'])
+        # Заглушки входят в ответы мест: bulk_update не отправляет сигналы,
+        # поэтому сами обновляем updated_at и сбрасываем кэш ответов
+        Place.touch({image.place_id for image in batch})
+        return updated
+
+    def _image_placeholder(self, image):
+        # Изображение блоба делит с ним файлы: заглушка уже построена для блоба
+        if image.blob is not None and image.blob.placeholder:
+            return image.blob.placeholder
+        return self._build(image)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # Блобы заполняются первыми: их заглушки переиспользуют изображения
+        blobs = ImageBlob.objects.only(*RENDITION_FIELDS)
+        images = (
+            PlaceImage.objects.filter(status=PlaceImage.STATUS_READY)
+            .select_related('blob')
+            .only(*RENDITION_FIELDS, 'place_id', 'blob__placeholder')
+        )
+        if not options['force']:
+            blobs = blobs.filter(placeholder='')
+            images = images.filter(placeholder='')
+
+        blobs_updated = self._fill(blobs, self._build, self._save_blobs, batch_size)
+        updated = self._fill(images, self._image_placeholder, self._save_images, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Заполнено заглушек: изображений {updated}, блобов {blobs_updated}"))
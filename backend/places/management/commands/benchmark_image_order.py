@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from places.models import Place, PlaceImage
+from places.serializers import PlaceImageSerializer
+from places.views import PlaceViewSet
+
+
+def _seed(images_per_place):
+    """Создает место с изображениями (без файлов в хранилище)."""
+    place = Place.objects.create(name='Бенчмарк порядка изображений')
+    PlaceImage.objects.bulk_create(
+        [
+            PlaceImage(place=place, image=f"places/order_{place.pk}_{order}.jpg", order=order, width=1200, height=800)
+            for order in range(images_per_place)
+        ],
+        batch_size=1000,
+    )
+    return place
+
+
+def _legacy_reorder(place, image_ids, request):
+    """Прежний алгоритм: вложенный цикл, save() на каждое изображение и повторное чтение."""
+    images = list(PlaceImage.objects.filter(id__in=image_ids, place=place))
+    for i, image_id in enumerate(image_ids):
+        for image in images:
+            if image.id == int(image_id):
+                image.order = i
+                image.save()
+                break
+    updated_images = PlaceImage.objects.filter(place=place).order_by('order')
+    return PlaceImageSerializer(updated_images, many=True, context={'request': request}).data
+
+
+def _reorder(place, image_ids, request):
+    """Текущий путь: action update_image_order целиком."""
+    view = PlaceViewSet.as_view({'post': 'update_image_order'})
+    response = view(APIRequestFactory().post(
+        f"/api/places/{place.slug}/update_image_order/", {'image_ids': image_ids}, format='json',
+    ), slug=place.slug)
+    if response.status_code != 200:
+        raise CommandError(f"update_image_order вернул {response.status_code}: {response.data}")
+    return response.data
+
+
+class Command(BaseCommand):
+    """Бенчмарк перестановки изображений места."""
+    help = 'Сравнивает update_image_order с прежним алгоритмом (по UPDATE на изображение)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=500, help='Сколько изображений у места')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _measure(self, label, function, place, image_ids, request):
+        # Оба пути проверяются на одних и тех же перестановках
+        timings = []
+        for ids in image_ids:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                data = function(place, ids, request)
+                timings.append(time.perf_counter() - started)
+            order = [image['id'] for image in data]
+            if order[:len(ids)] != ids:
+                raise CommandError(f"{label}: порядок в ответе не совпадает с запрошенным")
+        best = min(timings)
+        self.stdout.write(
+            f"  {label}: {best * 1000:.1f} мс (лучшее из {len(timings)}), "
+            f"{len(queries)} запросов, ответ {len(JSONRenderer().render(data))} Б"
+        )
+        return best
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/'))
+        self.stdout.write(f"Место с {options['images']} изображениями:")
+        # Синтетические данные живут только внутри транзакции и откатываются
+        with transaction.atomic():
+            place = _seed(options['images'])
+            ids = list(PlaceImage.objects.filter(place=place).values_list('id', flat=True))
+            orders = [random.sample(ids, len(ids)) for _ in range(options['repeat'])]
+            legacy = self._measure('прежний алгоритм', _legacy_reorder, place, orders, request)
+            current = self._measure('update_image_order', _reorder, place, orders, request)
+            self.stdout.write(f"  ускорение x{legacy / current:.1f}")
+            transaction.set_rollback(True)
@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from places.images import process_image
+
+
+def _sample_jpeg(width, height, orientation):
+    """Готовит синтетическую фотографию с шумом и тегом ориентации."""
+    img = Image.effect_noise((width, height), 40).convert('RGB')
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=90, exif=exif)
+    return output.getvalue()
+
+
+def _reset_peak_rss():
+    """Сбрасывает счетчик пиковой памяти процесса (только Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_kb():
+    """Возвращает пиковую резидентную память процесса в КБ."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run(path, draft, repeat, variant_sizes, formats, result):
+    """Выполняется в отдельном процессе, чтобы пиковая память не смешивалась."""
+    # Пик, унаследованный от родительского процесса, не должен попасть в замер
+    _reset_peak_rss()
+    baseline = _peak_rss_kb()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with open(path, 'rb') as source:
+            process_image(File(source, name='bench.jpg'), variant_sizes=variant_sizes, formats=formats, draft=draft)
+    elapsed = time.perf_counter() - started
+    peak = _peak_rss_kb() - baseline
+    result.put((elapsed / repeat, peak))
+
+
+class Command(BaseCommand):
+    """Бенчмарк обработки изображений: полное и уменьшенное декодирование."""
+    help = 'Измеряет время на мегапиксель и пиковую память обработки изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=7728)
+        parser.add_argument('--height', type=int, default=5152)
+        parser.add_argument('--orientation', type=int, default=6, help='Тег ориентации EXIF')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--formats', action='store_true', help='Включить кодирование в IMAGE_FORMATS')
+
+    def handle(self, *args, **options):
+        data = _sample_jpeg(options['width'], options['height'], options['orientation'])
+        megapixels = options['width'] * options['height'] / 1_000_000
+        variant_sizes = getattr(settings, 'IMAGE_VARIANTS', {})
+        formats = getattr(settings, 'IMAGE_FORMATS', ()) if options['formats'] else ()
+        self.stdout.write(f"Изображение {options['width']}x{options['height']} ({megapixels:.1f} Мп), {len(data)} Б")
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as sample:
+            sample.write(data)
+        del data
+
+        # Каждый режим измеряется в новом процессе, чтобы пик памяти был своим
+        context = multiprocessing.get_context('spawn')
+        try:
+            for label, draft in (('полное декодирование', False), ('уменьшенное декодирование', True)):
+                result = context.Queue()
+                process = context.Process(
+                    target=_run,
+                    args=(sample.name, draft, options['repeat'], variant_sizes, formats, result),
+                )
+                process.start()
+                seconds, peak_kb = result.get()
+                process.join()
+                self.stdout.write(
+                    f"{label}: {seconds * 1000 / megapixels:.1f} мс/Мп, "
+                    f"пиковая память +{peak_kb / 1024:.0f} МБ"
+                )
+        finally:
+            os.remove(sample.name)
@@ -0,0 +1,92 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Prefetch
+from django.test.utils import CaptureQueriesContext
+
+from places.models import Place, PlaceImage
+
+from .benchmark_place_list import _seed
+
+
+def _prefetch_all(limit):
+    """Прежний путь: все изображения каждого места ради одной обложки."""
+    places = Place.objects.order_by('-created_at', '-id').prefetch_related('images')[:limit]
+    result = []
+    for place in places:
+        images = list(place.images.all())
+        result.append((place.pk, images[0].pk if images else None, len(images)))
+    return result
+
+
+def _prefetch_slice(limit):
+    """Срез в Prefetch и COUNT по JOIN: одна обложка на место, но отдельными запросами."""
+    places = (
+        Place.objects.order_by('-created_at', '-id')
+        .annotate(counted_images=Count('images'))
+        .prefetch_related(Prefetch('images', queryset=PlaceImage.objects.order_by('order', 'id')[:1], to_attr='covers'))
+    )[:limit]
+    return [(place.pk, place.covers[0].pk if place.covers else None, place.counted_images) for place in places]
+
+
+def _denormalized(limit):
+    """Текущий путь: Place.cover_image и Place.image_count приходят одним запросом."""
+    places = Place.objects.order_by('-created_at', '-id').select_related('cover_image')[:limit]
+    return [
+        (place.pk, place.cover_image.pk if place.cover_image else None, place.image_count)
+        for place in places
+    ]
+
+
+PATHS = (
+    ('prefetch_related(images)', _prefetch_all),
+    ('срез Prefetch + COUNT', _prefetch_slice),
+    ('cover_image + image_count', _denormalized),
+)
+
+
+class Command(BaseCommand):
+    """Сравнение способов получить обложку и число изображений для списка мест."""
+    help = 'Сравнивает время, число запросов и пиковую память загрузки обложек списка мест'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--places', type=int, default=1000)
+        parser.add_argument('--images-per-place', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _measure(self, function, limit, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function(limit)
+            timings.append(time.perf_counter() - started)
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            result = function(limit)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return result, min(timings), len(queries), peak
+
+    def handle(self, *args, **options):
+        limit = options['places']
+        self.stdout.write(f"{limit} мест по {options['images_per_place']} изображений:")
+        # Синтетические данные живут только внутри транзакции и откатываются
+        with transaction.atomic():
+            _seed(limit, options['images_per_place'])
+            if connection.vendor == 'postgresql':
+                # Статистика для планировщика, как после autovacuum на живых данных
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {Place._meta.db_table}, {PlaceImage._meta.db_table}")
+            expected = None
+            for label, function in PATHS:
+                result, elapsed, queries, peak = self._measure(function, limit, options['repeat'])
+                if expected is None:
+                    expected = result
+                elif result != expected:
+                    raise CommandError(f"{label}: обложки или число изображений отличаются от эталона")
+                self.stdout.write(
+                    f"  {label}: {elapsed * 1000:.0f} мс, {queries} запросов, пик памяти {peak / 1024 / 1024:.1f} МБ"
+                )
+            transaction.set_rollback(True)
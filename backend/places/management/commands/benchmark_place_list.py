@@ -0,0 +1,133 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from places import fast_read
+from places.filters import filter_places
+from places.models import Place, PlaceImage
+from places.serializers import PlaceListSerializer
+from places.views import PlaceViewSet
+
+# Наборы полей, на которых сверяются оба пути: имя -> параметры запроса
+SHAPES = {
+    'компактный': {},
+    'полный': {'expand': 'images,review,pros,cons'},
+    'выборочный': {'fields': 'id,slug,name,dates,image_count'},
+}
+
+
+def _make_request(params):
+    return Request(APIRequestFactory().get('/api/places/', params))
+
+
+def _serializer_path(request, limit):
+    """Эталон: тот же queryset и сериализатор, что у PlaceViewSet.list без быстрого пути."""
+    view = PlaceViewSet(action='list', request=request, format_kwarg=None, kwargs={})
+    places = list(view.get_queryset().order_by('-created_at', '-id')[:limit])
+    return view.get_serializer(places, many=True).data
+
+
+def _fast_path(request, limit):
+    fields = PlaceListSerializer.selected_fields(request.query_params)
+    queryset = filter_places(Place.objects.all(), request.query_params)
+    rows = fast_read.place_rows(queryset, fields).order_by('-created_at', '-id')[:limit]
+    return fast_read.serialize_places(rows, fields, request)
+
+
+def _seed(count, images_per_place):
+    """Создает синтетические места с изображениями (без файлов в хранилище)."""
+    places = Place.objects.bulk_create(
+        [
+            Place(
+                name=f"Место {i}", slug=f"benchmark-{i}", location=f"Город {i % 50}",
+                rating=i % 5 + 1, review='Отзыв ' * 40, pros='Плюсы', cons='Минусы',
+                dates='01.05.2024 – 10.05.2024', dates_display='1–10 май 2024', username=f"user{i % 100}",
+            )
+            for i in range(count)
+        ],
+        batch_size=2000,
+    )
+    images = []
+    for place in places:
+        for order in range(images_per_place):
+            name = f"places/bench_{place.pk}_{order}.jpg"
+            images.append(PlaceImage(
+                place=place, image=name, order=order, width=1200, height=800, placeholder='data:image/webp;base64,AAAA',
+                variants={'thumb': {'name': name.replace('.jpg', '_thumb.jpg'), 'width': 320, 'height': 213}},
+            ))
+    PlaceImage.objects.bulk_create(images, batch_size=5000)
+    # bulk_create не отправляет сигналы: обложки и счетчики пересчитываем сами
+    Place.refresh_images([place.pk for place in places])
+
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    body = JSONRenderer().render(result)
+    return time.perf_counter() - started, body
+
+
+class Command(BaseCommand):
+    """Сверка и бенчмарк быстрого пути чтения списка мест с сериализатором DRF."""
+    help = 'Сравнивает вывод и скорость быстрого пути списка мест и PlaceListSerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000', help='Размеры выборок через запятую')
+        parser.add_argument('--images-per-place', type=int, default=3)
+        parser.add_argument('--sample', type=int, default=200, help='Сколько мест сверять по каждому набору полей')
+        parser.add_argument('--check-only', action='store_true', help='Только сверить вывод на текущих данных')
+
+    def _check(self, sample):
+        """Сверяет вывод обоих путей байт в байт. Возвращает число расхождений."""
+        failures = 0
+        for label, params in SHAPES.items():
+            request = _make_request(params)
+            expected = JSONRenderer().render(_serializer_path(request, sample))
+            actual = JSONRenderer().render(_fast_path(request, sample))
+            if expected == actual:
+                self.stdout.write(f"  сверка «{label}»: совпадает ({len(expected)} Б)")
+                continue
+            failures += 1
+            expected_items, actual_items = json.loads(expected), json.loads(actual)
+            for index, (left, right) in enumerate(zip(expected_items, actual_items)):
+                if left != right:
+                    keys = sorted(key for key in set(left) | set(right) if left.get(key) != right.get(key))
+                    self.stderr.write(f"  сверка «{label}»: элемент {index} отличается в полях {', '.join(keys)}")
+                    break
+            else:
+                self.stderr.write(f"  сверка «{label}»: {len(expected_items)} и {len(actual_items)} элементов")
+        return failures
+
+    def _benchmark(self, count):
+        request = _make_request({})
+        serializer_time, serializer_body = _timed(_serializer_path, request, count)
+        fast_time, fast_body = _timed(_fast_path, request, count)
+        self.stdout.write(
+            f"  {count} мест: сериализатор {serializer_time * 1000:.0f} мс "
+            f"({serializer_time / count * 1e6:.0f} мкс/место), быстрый путь {fast_time * 1000:.0f} мс "
+            f"({fast_time / count * 1e6:.0f} мкс/место), ускорение x{serializer_time / fast_time:.1f}, "
+            f"ответ {'одинаковый' if serializer_body == fast_body else 'ОТЛИЧАЕТСЯ'}"
+        )
+
+    def handle(self, *args, **options):
+        if options['check_only']:
+            if self._check(options['sample']):
+                raise CommandError('Вывод быстрого пути отличается от сериализатора')
+            return
+
+        failures = 0
+        for count in [int(value) for value in options['rows'].split(',')]:
+            self.stdout.write(f"Выборка {count} мест:")
+            # Синтетические данные живут только внутри транзакции и откатываются
+            with transaction.atomic():
+                _seed(count, options['images_per_place'])
+                failures += self._check(options['sample'])
+                self._benchmark(count)
+                transaction.set_rollback(True)
+        if failures:
+            raise CommandError('Вывод быстрого пути отличается от сериализатора')
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from places.views import PlaceViewSet
+
+# Представления списка: имя -> параметры запроса
+SHAPES = {
+    'полное (как карточка)': {'expand': 'images,review,pros,cons'},
+    'компактное (по умолчанию)': {},
+    'лента (карусель)': {'fields': 'id,slug,name,dates,rating,location,created_at', 'expand': 'images'},
+    'только ссылки': {'fields': 'id,slug,name'},
+}
+
+
+class Command(BaseCommand):
+    """Сравнение представлений списка мест по объему и времени."""
+    help = 'Измеряет размер ответа и время сериализации списка мест для разных ?fields=/?expand='
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Сколько мест сериализовать')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _measure(self, params, limit):
+        request = Request(APIRequestFactory().get('/api/places/', params))
+        view = PlaceViewSet(action='list', request=request, format_kwarg=None, kwargs={})
+
+        started = time.perf_counter()
+        places = list(view.get_queryset().order_by('-created_at', '-id')[:limit])
+        query_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        body = JSONRenderer().render(view.get_serializer(places, many=True).data)
+        serialize_time = time.perf_counter() - started
+        return len(places), len(body), query_time, serialize_time
+
+    def handle(self, *args, **options):
+        for label, params in SHAPES.items():
+            runs = [self._measure(params, options['limit']) for _ in range(options['repeat'])]
+            count, size = runs[0][0], runs[0][1]
+            query_time = min(run[2] for run in runs)
+            serialize_time = min(run[3] for run in runs)
+            per_item = size / count if count else 0
+            self.stdout.write(
+                f"{label}: {count} мест, {size / 1024:.1f} КБ ({per_item:.0f} Б/место), "
+                f"запросы {query_time * 1000:.1f} мс, сериализация {serialize_time * 1000:.1f} мс"
+            )
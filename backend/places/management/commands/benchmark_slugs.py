@@ -0,0 +1,76 @@
+import re
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from places.models import Place
+
+# Названия для замеров: обычное и с числом на конце
+NAMES = ('Hotel', 'Комната 5')
+
+# Прежний цикл на названиях с числом на конце не завершается: ограничиваем его
+LEGACY_MAX_PROBES = 50
+
+
+def _legacy_slug(name):
+    """Прежний подбор slug из Place.save: exists() на каждый кандидат."""
+    slug = Place.base_slug(name)
+    original_slug = slug
+    probes = 0
+    while Place.objects.filter(slug=slug).exists():
+        probes += 1
+        if probes == LEGACY_MAX_PROBES:
+            return None
+        match = re.search(r'(.*?)(\d+)$', original_slug)
+        if match:
+            slug = f"{match.group(1)}{int(match.group(2)) + 1}"
+        else:
+            slug = f"{original_slug}-{uuid.uuid4().hex[:6]}"
+    return slug
+
+
+def _allocated_slug(name):
+    return Place.allocate_slugs([Place.base_slug(name)])[0]
+
+
+class Command(BaseCommand):
+    """Бенчмарк подбора slug для новых мест (параллельные создания проверяет tests/test_slugs.py)."""
+    help = 'Измеряет подбор slug для мест с одинаковыми названиями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--existing', default='0,10,100,1000', help='Сколько мест с тем же названием уже есть')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def _measure(self, function, name, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                slug = function(name)
+            elapsed = time.perf_counter() - started
+        return slug, elapsed / repeat, len(queries) / repeat
+
+    def _benchmark(self, counts, repeat):
+        for name in NAMES:
+            self.stdout.write(f"Название «{name}»:")
+            for count in counts:
+                # Синтетические данные живут только внутри транзакции и откатываются
+                with transaction.atomic():
+                    for _ in range(count):
+                        Place.objects.create(name=name)
+                    legacy, legacy_time, legacy_queries = self._measure(_legacy_slug, name, repeat)
+                    slug, allocated_time, allocated_queries = self._measure(_allocated_slug, name, repeat)
+                    transaction.set_rollback(True)
+                legacy_label = (
+                    f"{legacy_time * 1000:.2f} мс, {legacy_queries:.0f} запросов"
+                    if legacy else f"не нашел свободный slug за {LEGACY_MAX_PROBES} проверок"
+                )
+                self.stdout.write(
+                    f"  занято {count}: прежний цикл {legacy_label}; "
+                    f"allocate_slugs {allocated_time * 1000:.2f} мс, {allocated_queries:.0f} запрос -> {slug}"
+                )
+
+    def handle(self, *args, **options):
+        self._benchmark([int(value) for value in options['existing'].split(',')], options['repeat'])
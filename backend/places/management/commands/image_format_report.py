@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from places.models import PlaceImage
+
+
+class Command(BaseCommand):
+    """Отчет об экономии трафика за счет дополнительных форматов изображений."""
+    help = 'Показывает размер каждого изображения в исходном и дополнительных форматах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--place', help='Slug места, по которому строится отчет')
+
+    def _renditions(self, image):
+        """Возвращает уникальные рендеры изображения: основной файл и варианты."""
+        renditions = {image.image.name: {'bytes': image.image.size, 'formats': image.formats}}
+        for variant in (image.variants or {}).values():
+            renditions.setdefault(variant['name'], variant)
+        return renditions.values()
+
+    def handle(self, *args, **options):
+        images = PlaceImage.objects.exclude(formats={}).select_related('place').order_by('id')
+        if options['place']:
+            images = images.filter(place__slug=options['place'])
+
+        totals = {}
+        total_original = 0
+        for image in images:
+            original = 0
+            by_format = {}
+            for rendition in self._renditions(image):
+                original += rendition['bytes']
+                for fmt, info in (rendition.get('formats') or {}).items():
+                    by_format[fmt] = by_format.get(fmt, 0) + info['bytes']
+
+            parts = [f"{image.id} {image.image.name}: исходный {original} Б"]
+            for fmt, size in sorted(by_format.items()):
+                saving = 100 * (original - size) / original if original else 0
+                parts.append(f"{fmt} {size} Б (экономия {saving:.1f}%)")
+                totals[fmt] = totals.get(fmt, 0) + size
+            total_original += original
+            self.stdout.write(', '.join(parts))
+
+        if not total_original:
+            self.stdout.write('Нет изображений с дополнительными форматами')
+            return
+        summary = [f"Итого: исходный {total_original} Б"]
+        for fmt, size in sorted(totals.items()):
+            saving = 100 * (total_original - size) / total_original
+            summary.append(f"{fmt} {size} Б (экономия {saving:.1f}%)")
+        self.stdout.write(self.style.SUCCESS(', '.join(summary)))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from places.tasks import drain_queue
+
+
+class Command(BaseCommand):
+    """Отдельный воркер очереди обработки изображений."""
+    help = 'Обрабатывает задания из очереди обработки изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Разобрать очередь один раз и завершиться')
+        parser.add_argument('--interval', type=float, default=2.0, help='Пауза между проверками очереди, сек.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = drain_queue()
+            if processed:
+                self.stdout.write(f"Обработано заданий: {processed}")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from places.models import ProfileStats
+
+
+class Command(BaseCommand):
+    """Пересобирает сводки профилей, если сигналы их не обновили (массовые правки, сбои)."""
+    help = 'Пересчитывает ProfileStats всех пользователей и сообщает, сколько сводок расходилось с данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Сколько пользователей пересчитывать за раз')
+
+    def handle(self, *args, **options):
+        user_ids = get_user_model().objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        checked = changed = 0
+        for user_id in user_ids.iterator(chunk_size=options['batch_size']):
+            batch.append(user_id)
+            if len(batch) >= options['batch_size']:
+                changed += ProfileStats.refresh(batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            changed += ProfileStats.refresh(batch)
+            checked += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Проверено сводок: {checked}, исправлено: {changed}"))
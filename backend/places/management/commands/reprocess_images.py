@@ -0,0 +1,170 @@
+import json
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Min, Q
+
+from places.images import process_image
+from places.models import PlaceImage
+
+
+def _init_worker():
+    """Готовит процесс пула: свои соединения с БД и пониженный приоритет."""
+    connections.close_all()
+    # Воркеры не должны отнимать процессор у живых запросов
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def _reprocess(image_id):
+    """Повторно обрабатывает одно изображение. Выполняется в процессе пула."""
+    started = time.perf_counter()
+    try:
+        image = PlaceImage.objects.get(pk=image_id)
+        bytes_before = sum(image.image.storage.size(name) for name in image.stored_files())
+        if not image.reprocess():
+            return image_id, 'skipped', 0, 0, time.perf_counter() - started
+        bytes_after = sum(image.image.storage.size(name) for name in image.stored_files())
+        return image_id, 'done', bytes_before, bytes_after, time.perf_counter() - started
+    except PlaceImage.DoesNotExist:
+        return image_id, 'skipped', 0, 0, time.perf_counter() - started
+    except Exception as e:
+        return image_id, f'error: {e}', 0, 0, time.perf_counter() - started
+
+
+def _rendered_bytes(processed):
+    """Считает суммарный размер всех файлов, полученных из process_image."""
+    total = 0
+    for rendition in [processed['main'], *processed['variants'].values()]:
+        if rendition['content'] is not None:
+            total += rendition['content'].size
+        total += sum(content.size for content in rendition['alternates'].values())
+    return total
+
+
+class Command(BaseCommand):
+    """Повторная обработка уже загруженных изображений по текущим настройкам."""
+    help = 'Пересоздает основные файлы, варианты размеров и форматы для сохраненных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                            help='Число процессов-воркеров')
+        parser.add_argument('--place', help='Обработать только изображения места с этим slug')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, 'reprocess_images.checkpoint.json'),
+                            help='Файл контрольной точки для продолжения прерванного запуска')
+        parser.add_argument('--reset', action='store_true', help='Начать заново, игнорируя контрольную точку')
+        parser.add_argument('--dry-run', action='store_true', help='Только оценить изменение объема хранилища')
+        parser.add_argument('--sample', type=int, default=20, help='Размер выборки для --dry-run')
+        parser.add_argument('--batch-size', type=int, default=100, help='Сколько изображений выбирать из БД за раз')
+
+    def _queryset(self, options):
+        images = PlaceImage.objects.filter(status=PlaceImage.STATUS_READY)
+        if options['place']:
+            images = images.filter(place__slug=options['place'])
+        # reprocess() переписывает файлы блоба сразу для всех его изображений:
+        # каждый блоб обрабатывается один раз, через изображение с наименьшим id,
+        # иначе его файлы перекодировались бы с потерями столько раз, сколько ссылок
+        first_per_blob = (
+            images.filter(blob__isnull=False).order_by().values('blob_id').annotate(first_id=Min('id')).values('first_id')
+        )
+        return images.filter(Q(blob__isnull=True) | Q(pk__in=first_per_blob)).order_by('id')
+
+    def _load_checkpoint(self, options):
+        if options['reset'] or not os.path.exists(options['checkpoint']):
+            return {'last_id': 0, 'processed': 0, 'bytes_before': 0, 'bytes_after': 0}
+        with open(options['checkpoint']) as checkpoint:
+            return json.load(checkpoint)
+
+    def _save_checkpoint(self, options, state):
+        # Пишем через временный файл, чтобы прерывание не испортило контрольную точку
+        tmp_path = f"{options['checkpoint']}.tmp"
+        with open(tmp_path, 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(tmp_path, options['checkpoint'])
+
+    def _dry_run(self, options):
+        images = self._queryset(options)
+        total = images.count()
+        sample = list(images[:options['sample']])
+        if not sample:
+            self.stdout.write('Нет изображений для обработки')
+            return
+
+        bytes_before = bytes_after = 0
+        started = time.perf_counter()
+        for image in sample:
+            storage = image.image.storage
+            bytes_before += sum(storage.size(name) for name in image.stored_files())
+            with storage.open(image.largest_rendition()) as source:
+                processed = process_image(File(source, name=os.path.basename(image.image.name)),
+                                          **image.processing_options())
+            bytes_after += _rendered_bytes(processed)
+        per_image = (time.perf_counter() - started) / len(sample)
+
+        scale = total / len(sample)
+        self.stdout.write(f"Изображений к обработке: {total} (выборка {len(sample)})")
+        self.stdout.write(
+            f"Оценка объема: {bytes_before * scale / 1024 ** 2:.1f} МБ -> {bytes_after * scale / 1024 ** 2:.1f} МБ"
+        )
+        self.stdout.write(
+            f"Оценка времени: {per_image * total / options['workers']:.0f} с на {options['workers']} воркерах"
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self._dry_run(options)
+            return
+
+        state = self._load_checkpoint(options)
+        if state['last_id']:
+            self.stdout.write(f"Продолжаем после изображения {state['last_id']}")
+
+        # Соединения родителя не должны попасть в дочерние процессы;
+        # fork наследует настроенный Django, команда однопоточная
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        started = time.perf_counter()
+        done_in_run = 0
+        with context.Pool(options['workers'], initializer=_init_worker) as pool:
+            while True:
+                ids = list(
+                    self._queryset(options)
+                    .filter(id__gt=state['last_id'])
+                    .values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                # imap сохраняет порядок, поэтому last_id всегда означает,
+                # что все изображения до него включительно обработаны
+                for image_id, result, before, after, _ in pool.imap(_reprocess, ids):
+                    if result.startswith('error'):
+                        self.stderr.write(f"Изображение {image_id}: {result}")
+                    elif result == 'done':
+                        state['processed'] += 1
+                        state['bytes_before'] += before
+                        state['bytes_after'] += after
+                        done_in_run += 1
+                    state['last_id'] = image_id
+                self._save_checkpoint(options, state)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Обработано {state['processed']} (до id {state['last_id']}), "
+                    f"{done_in_run / elapsed:.2f} изобр./с"
+                )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {done_in_run} изображений за {elapsed:.1f} с "
+            f"({done_in_run / elapsed if elapsed else 0:.2f} изобр./с), объем "
+            f"{state['bytes_before'] / 1024 ** 2:.1f} МБ -> {state['bytes_after'] / 1024 ** 2:.1f} МБ"
+        ))
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
@@ -0,0 +1,301 @@
+"""
+Выдача медиафайлов в продакшене.
+
+Файлы изображений неизменяемы (обработка всегда пишет новые имена),
+поэтому отдаются с сильным ETag и долгим Cache-Control. Поддерживаются
+запросы диапазонов (Range), передача отдачи веб-серверу через
+X-Accel-Redirect/X-Sendfile и изменение размера на лету (?w=&h=&fmt=)
+с дисковым LRU-кэшем готовых рендеров.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from PIL import features
+
+from .images import EXTRA_FORMATS, alternate_path, negotiate_format, render_to_box
+
+logger = logging.getLogger(__name__)
+
+# Форматы, которые можно запросить параметром fmt
+RESIZE_FORMATS = {
+    'jpeg': ('.jpg', 'image/jpeg'),
+    'png': ('.png', 'image/png'),
+    'webp': ('.webp', 'image/webp'),
+    'avif': ('.avif', 'image/avif'),
+}
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_eviction_lock = threading.Lock()
+_bytes_since_eviction = 0
+
+
+def _cache_root():
+    default = os.path.join(os.path.dirname(os.path.abspath(settings.MEDIA_ROOT)), 'media_cache')
+    return os.path.abspath(getattr(settings, 'MEDIA_CACHE_ROOT', default))
+
+
+def _is_within(path, root):
+    return os.path.commonpath([os.path.abspath(path), root]) == root
+
+
+def _make_etag(stat, render_key=''):
+    """
+    Сильный ETag по атрибутам файла: содержимое файла под одним именем не меняется.
+    Для рендера берутся атрибуты исходника и параметры рендера (render_key).
+    """
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}:{render_key}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _allowed_sizes(axis):
+    """Ширины (axis=0) или высоты (axis=1) вариантов из IMAGE_VARIANTS, по возрастанию."""
+    limit = getattr(settings, 'MEDIA_RESIZE_MAX', 2400)
+    sizes = sorted({box[axis] for box in getattr(settings, 'IMAGE_VARIANTS', {}).values() if box[axis] <= limit})
+    return sizes or [limit]
+
+
+def _parse_dimension(value, axis):
+    """
+    Разбирает w/h: целое от 1 до MEDIA_RESIZE_MAX, иначе ValueError.
+
+    Размер округляется вверх до ближайшего из _allowed_sizes, чтобы число
+    разных рендеров одного файла (и объем кэша) было ограничено.
+    """
+    if value is None:
+        return None
+    number = int(value)
+    if not 1 <= number <= getattr(settings, 'MEDIA_RESIZE_MAX', 2400):
+        raise ValueError(value)
+    sizes = _allowed_sizes(axis)
+    return next((size for size in sizes if size >= number), sizes[-1])
+
+
+def _evict_if_needed(written):
+    """
+    Удерживает дисковый кэш рендеров в пределах MEDIA_CACHE_MAX_BYTES.
+
+    Каталог сканируется не на каждую запись, а когда с прошлой проверки
+    записано больше десятой части лимита. Удаляются файлы с самым давним
+    временем доступа (при попадании в кэш оно обновляется).
+    """
+    global _bytes_since_eviction
+    limit = getattr(settings, 'MEDIA_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+    with _eviction_lock:
+        _bytes_since_eviction += written
+        if _bytes_since_eviction < limit // 10:
+            return
+        _bytes_since_eviction = 0
+
+    entries = []
+    total = 0
+    for directory, _, files in os.walk(_cache_root()):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+    if total <= limit:
+        return
+
+    # Освобождаем с запасом, чтобы не сканировать каталог на каждой записи
+    target = limit * 0.9
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        if total <= target:
+            break
+
+
+def _rendered_path(source_path, source_stat, box, fmt):
+    """Возвращает путь рендера в кэше, создавая его при необходимости."""
+    key = f"{source_path}:{source_stat.st_mtime_ns}:{box[0]}x{box[1]}:{fmt}"
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    extension = RESIZE_FORMATS[fmt][0] if fmt else os.path.splitext(source_path)[1]
+    cached = os.path.join(_cache_root(), digest[:2], f"{digest}{extension}")
+
+    try:
+        stat = os.stat(cached)
+    except FileNotFoundError:
+        pass
+    else:
+        # Вытеснение LRU работает по времени доступа; время изменения не трогаем
+        os.utime(cached, ns=(time.time_ns(), stat.st_mtime_ns))
+        return cached
+
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    with open(source_path, 'rb') as source:
+        rendered = render_to_box(source, box, fmt)
+    # Пишем во временный файл и атомарно переименовываем: параллельный
+    # запрос никогда не увидит недописанный рендер
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cached))
+    with os.fdopen(fd, 'wb') as output:
+        for chunk in rendered.chunks():
+            output.write(chunk)
+    os.replace(tmp_path, cached)
+    _evict_if_needed(rendered.size)
+    return cached
+
+
+def _offload_response(path):
+    """Передает отдачу файла веб-серверу, если это настроено."""
+    offload = getattr(settings, 'MEDIA_OFFLOAD', '')
+    if offload == 'nginx':
+        # Рендеры лежат вне MEDIA_ROOT, для них отдельный internal-location
+        locations = (
+            (_cache_root(), getattr(settings, 'MEDIA_CACHE_ACCEL_PREFIX', '/protected-media-cache/')),
+            (os.path.abspath(settings.MEDIA_ROOT), getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')),
+        )
+        for root, prefix in locations:
+            if _is_within(path, root):
+                response = HttpResponse()
+                response['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{os.path.relpath(path, root)}"
+                return response
+        return None
+    if offload == 'sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+        return response
+    return None
+
+
+def _range_response(request, path, size, etag):
+    """
+    Возвращает 206/416 для запроса одного диапазона или None для полного ответа.
+
+    Несколько диапазонов в одном запросе не поддерживаются — на них
+    отдается файл целиком, что допускает RFC 9110.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    elif end:
+        # Суффиксный диапазон: последние N байт
+        start = max(size - int(end), 0)
+        end = size - 1
+    else:
+        return None
+    if start >= size or start > end:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    with open(path, 'rb') as source:
+        source.seek(start)
+        body = source.read(end - start + 1)
+    response = HttpResponse(body, status=206)
+    response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Отдает медиафайл.
+
+    Без параметров отдается сам файл, а если клиент явно принимает AVIF
+    или WebP и рядом лежит копия в этом формате — копия. С параметрами
+    w, h и fmt файл вписывается в рамку и перекодируется; готовые рендеры
+    хранятся в дисковом LRU-кэше.
+    """
+    try:
+        source_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Файл не найден")
+    # Кэш рендеров, оставленный внутри MEDIA_ROOT настройкой, напрямую не отдается
+    if not os.path.isfile(source_path) or _is_within(source_path, _cache_root()):
+        raise Http404("Файл не найден")
+
+    accept = request.META.get('HTTP_ACCEPT')
+    negotiated = False
+    try:
+        width = _parse_dimension(request.GET.get('w'), 0)
+        height = _parse_dimension(request.GET.get('h'), 1)
+    except ValueError:
+        return HttpResponseBadRequest("Некорректный размер")
+    fmt = request.GET.get('fmt')
+    if fmt is not None and (fmt not in RESIZE_FORMATS or (fmt in EXTRA_FORMATS and not features.check(fmt))):
+        return HttpResponseBadRequest("Неподдерживаемый формат")
+
+    if width or height or fmt:
+        if fmt is None:
+            fmt = negotiate_format(accept, [name for name in EXTRA_FORMATS if features.check(name)])
+            negotiated = True
+        box = (width or 100000, height or 100000)
+        source_stat = os.stat(source_path)
+        # Валидаторы рендера не зависят от файла в кэше: он может быть
+        # вытеснен и создан заново, а содержимое от этого не меняется
+        render_key = f"{box[0]}x{box[1]}:{fmt}"
+        try:
+            file_path = _rendered_path(source_path, source_stat, box, fmt)
+        except Exception as e:
+            logger.error(f"Ошибка рендера {path}: {str(e)}")
+            raise Http404("Не удалось обработать файл")
+        content_type = RESIZE_FORMATS[fmt][1] if fmt else mimetypes.guess_type(source_path)[0]
+    else:
+        source_stat = render_key = None
+        file_path = source_path
+        content_type = mimetypes.guess_type(source_path)[0]
+        alternate = negotiate_format(accept, getattr(settings, 'IMAGE_FORMATS', ()))
+        negotiated = True
+        if alternate and os.path.isfile(alternate_path(source_path, alternate)):
+            file_path = alternate_path(source_path, alternate)
+            content_type = EXTRA_FORMATS[alternate][1]
+
+    stat = os.stat(file_path)
+    if render_key is None:
+        etag = _make_etag(stat)
+        last_modified = stat.st_mtime
+    else:
+        etag = _make_etag(source_stat, render_key)
+        last_modified = source_stat.st_mtime
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is None:
+        response = _offload_response(file_path)
+    if response is None:
+        response = _range_response(request, file_path, stat.st_size, etag)
+    if response is None:
+        response = FileResponse(open(file_path, 'rb'))
+        response['Content-Length'] = stat.st_size
+
+    if response.status_code in (200, 206):
+        response['Content-Type'] = content_type or 'application/octet-stream'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = getattr(settings, 'MEDIA_CACHE_CONTROL', 'public, max-age=31536000, immutable')
+    if negotiated:
+        # Ответ зависит от Accept, это должны учитывать кэши
+        patch_vary_headers(response, ['Accept'])
+    return response
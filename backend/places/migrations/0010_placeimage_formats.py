@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0009_placeimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='placeimage',
+            name='formats',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Дополнительные форматы'),
+        ),
+    ]
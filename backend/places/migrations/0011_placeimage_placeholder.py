@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0010_placeimage_formats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='placeimage',
+            name='placeholder',
+            field=models.TextField(blank=True, default='', verbose_name='Превью-заглушка (data URI)'),
+        ),
+    ]
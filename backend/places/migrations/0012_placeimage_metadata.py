@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0011_placeimage_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='placeimage',
+            name='file_size',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Размер файла, байт'),
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота, px'),
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='orientation',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Ориентация EXIF'),
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='taken_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата съемки'),
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина, px'),
+        ),
+        migrations.AddIndex(
+            model_name='placeimage',
+            index=models.Index(fields=['place', 'taken_at'], name='places_plac_place_i_1277d3_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0012_placeimage_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='places/', verbose_name='Изображение')),
+                ('variants', models.JSONField(blank=True, default=dict, verbose_name='Варианты размеров')),
+                ('formats', models.JSONField(blank=True, default=dict, verbose_name='Дополнительные форматы')),
+                ('placeholder', models.TextField(blank=True, default='', verbose_name='Превью-заглушка (data URI)')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина, px')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота, px')),
+                ('file_size', models.PositiveIntegerField(blank=True, null=True, verbose_name='Размер файла, байт')),
+                ('taken_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата съемки')),
+                ('orientation', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Ориентация EXIF')),
+                ('content_hash', models.CharField(max_length=64, unique=True, verbose_name='SHA-256 исходника')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления')),
+            ],
+            options={
+                'verbose_name': 'Image Blob',
+                'verbose_name_plural': 'Image Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='images', to='places.imageblob', verbose_name='Общий файл'),
+        ),
+    ]
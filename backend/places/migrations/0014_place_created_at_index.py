@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0013_imageblob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['created_at', 'id'], name='places_plac_created_e20b91_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0014_place_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], name='places_plac_user_id_882b7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['username', 'created_at', 'id'], name='places_plac_usernam_10c8b7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['rating'], name='places_plac_rating_1aa694_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(django.db.models.functions.text.Upper('location'), name='place_location_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:53
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+# Копия places.dates на момент миграции: код приложения может измениться,
+# а миграция должна разбирать даты так же, как при ее создании
+MONTHS_RU = {
+    1: 'янв', 2: 'фев', 3: 'мар', 4: 'апр', 5: 'май', 6: 'июн',
+    7: 'июл', 8: 'авг', 9: 'сен', 10: 'окт', 11: 'ноя', 12: 'дек',
+}
+
+
+def stay_fields(dates):
+    """Значения start_date, end_date и dates_display для строки «ДД.ММ.ГГГГ – ДД.ММ.ГГГГ»."""
+    parts = dates.split('–') if dates and '.' in dates else []
+    try:
+        start_date, end_date = (datetime.strptime(part.strip(), '%d.%m.%Y').date() for part in parts)
+    except ValueError:
+        # Не две части или не даты: неразобранная строка показывается как есть
+        return {'start_date': None, 'end_date': None, 'dates_display': dates or ''}
+    if start_date.month == end_date.month and start_date.year == end_date.year:
+        display = f"{start_date.day}–{end_date.day} {MONTHS_RU[end_date.month]} {end_date.year}"
+    elif start_date.year == end_date.year:
+        display = f"{start_date.day} {MONTHS_RU[start_date.month]} – {end_date.day} {MONTHS_RU[end_date.month]} {end_date.year}"
+    else:
+        display = (
+            f"{start_date.day} {MONTHS_RU[start_date.month]} {start_date.year} – "
+            f"{end_date.day} {MONTHS_RU[end_date.month]} {end_date.year}"
+        )
+    return {'start_date': start_date, 'end_date': end_date, 'dates_display': display}
+
+
+def fill_stay_dates(apps, schema_editor):
+    """Разбирает даты уже сохраненных мест."""
+    Place = apps.get_model('places', 'Place')
+    batch = []
+    for place in Place.objects.exclude(dates__isnull=True).exclude(dates='').only('id', 'dates').iterator(chunk_size=1000):
+        for field, value in stay_fields(place.dates).items():
+            setattr(place, field, value)
+        batch.append(place)
+        if len(batch) >= 1000:
+            Place.objects.bulk_update(batch, ['start_date', 'end_date', 'dates_display'])
+            batch = []
+    if batch:
+        Place.objects.bulk_update(batch, ['start_date', 'end_date', 'dates_display'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0016_place_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='dates_display',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Даты для отображения'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='end_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Дата выезда'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='start_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Дата заезда'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['start_date', 'end_date'], name='places_plac_start_d_76802f_idx'),
+        ),
+        migrations.RunPython(fill_stay_dates, migrations.RunPython.noop),
+    ]
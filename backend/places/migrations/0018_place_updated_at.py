@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-17 11:55
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    """Для существующих мест время изменения неизвестно — берем время создания."""
+    Place = apps.get_model('places', 'Place')
+    Place.objects.update(updated_at=F('created_at'))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0017_place_stay_dates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['updated_at'], name='places_plac_updated_8dafc2_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:05
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_handles(apps, schema_editor):
+    """Канонические имена для существующих пользователей (как UserHandle.canonical)."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserHandle = apps.get_model('places', 'UserHandle')
+    UserHandle.objects.bulk_create(
+        [
+            UserHandle(user_id=user_id, handle=re.sub(r'\s+', '-', username.strip()).lower())
+            for user_id, username in User.objects.values_list('id', 'username').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('places', '0018_place_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHandle',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='handle', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('handle', models.CharField(db_index=True, max_length=150, verbose_name='Имя в URL')),
+            ],
+            options={
+                'verbose_name': 'User Handle',
+                'verbose_name_plural': 'User Handles',
+            },
+        ),
+        migrations.RunPython(fill_handles, migrations.RunPython.noop),
+    ]
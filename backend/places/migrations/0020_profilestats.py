@@ -0,0 +1,79 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, F, OuterRef, Subquery
+
+
+def fill_profile_stats(apps, schema_editor):
+    """
+    Сводки существующих пользователей (как ProfileStats.compute) одним
+    сгруппированным запросом по Place.user_id вместо пересчета по пользователю.
+    """
+    Place = apps.get_model('places', 'Place')
+    PlaceImage = apps.get_model('places', 'PlaceImage')
+    ProfileStats = apps.get_model('places', 'ProfileStats')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    own_places = Place.objects.filter(user_id=OuterRef('user_id')).order_by()
+    own_images = PlaceImage.objects.filter(place__user_id=OuterRef('user_id')).order_by()
+    rows = (
+        Place.objects.exclude(user_id__isnull=True).exclude(user_id='')
+        .order_by().values('user_id')
+        .annotate(
+            place_count=Count('id'),
+            average_rating=Avg('rating'),
+            image_count=Subquery(own_images.values('place__user_id').annotate(count=Count('id')).values('count')),
+            last_trip_id=Subquery(
+                own_places.order_by(F('start_date').desc(nulls_last=True), F('created_at').desc()).values('id')[:1]
+            ),
+            cover_image_id=Subquery(own_images.order_by(
+                F('place__start_date').desc(nulls_last=True), F('place__created_at').desc(), 'order', 'id',
+            ).values('id')[:1]),
+        )
+    )
+    user_ids = set(User.objects.values_list('pk', flat=True))
+    ProfileStats.objects.bulk_create(
+        [
+            ProfileStats(
+                user_id=int(row['user_id']),
+                place_count=row['place_count'],
+                image_count=row['image_count'] or 0,
+                average_rating=round(row['average_rating'], 2) if row['average_rating'] is not None else None,
+                last_trip_id=row['last_trip_id'],
+                cover_image_id=row['cover_image_id'],
+            )
+            for row in rows
+            if row['user_id'].isdigit() and int(row['user_id']) in user_ids
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('places', '0019_userhandle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('place_count', models.PositiveIntegerField(default=0, verbose_name='Число мест')),
+                ('image_count', models.PositiveIntegerField(default=0, verbose_name='Число изображений')),
+                ('average_rating', models.FloatField(blank=True, null=True, verbose_name='Средний рейтинг')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата пересчета')),
+                ('cover_image', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='places.placeimage', verbose_name='Обложка профиля')),
+                ('last_trip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='places.place', verbose_name='Последняя поездка')),
+            ],
+            options={
+                'verbose_name': 'Profile Stats',
+                'verbose_name_plural': 'Profile Stats',
+            },
+        ),
+        migrations.RunPython(fill_profile_stats, migrations.RunPython.noop),
+    ]
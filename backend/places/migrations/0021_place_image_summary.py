@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_image_summary(apps, schema_editor):
+    """Обложка и число изображений существующих мест (как Place.refresh_images)."""
+    Place = apps.get_model('places', 'Place')
+    PlaceImage = apps.get_model('places', 'PlaceImage')
+    images = PlaceImage.objects.filter(place_id=OuterRef('pk')).order_by()
+    Place.objects.update(
+        image_count=Coalesce(Subquery(images.values('place_id').annotate(count=Count('id')).values('count')), 0),
+        cover_image=Subquery(images.order_by('order', 'id').values('id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0020_profilestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='cover_image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='places.placeimage', verbose_name='Обложка'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='image_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число изображений'),
+        ),
+        migrations.RunPython(fill_image_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0021_place_image_summary'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='placeimage',
+            options={'ordering': ['order', 'id'], 'verbose_name': 'Place Image', 'verbose_name_plural': 'Place Images'},
+        ),
+    ]
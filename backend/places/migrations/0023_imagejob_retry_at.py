@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0022_placeimage_ordering_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Повторная попытка не раньше'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
+
+
+def fill_rating_totals(apps, schema_editor):
+    """Сумма и число оценок существующих сводок одним UPDATE с подзапросами по Place.user_id."""
+    Place = apps.get_model('places', 'Place')
+    ProfileStats = apps.get_model('places', 'ProfileStats')
+    own_places = (
+        Place.objects.filter(user_id=Cast(OuterRef('user_id'), models.CharField())).order_by()
+        .values('user_id')
+    )
+    ProfileStats.objects.update(
+        rating_sum=Coalesce(Subquery(own_places.annotate(total=Sum('rating')).values('total')), 0),
+        rated_count=Coalesce(Subquery(own_places.annotate(count=Count('rating')).values('count')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0023_imagejob_retry_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilestats',
+            name='rated_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число оценок'),
+        ),
+        migrations.AddField(
+            model_name='profilestats',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма рейтингов'),
+        ),
+        migrations.RunPython(fill_rating_totals, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='profilestats',
+            name='average_rating',
+        ),
+    ]
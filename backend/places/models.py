@@ -1,70 +1,33 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import BigIntegerField, Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Substr, Upper
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import get_random_string
 from django.utils.text import slugify
 import transliterate
-from PIL import Image, ImageOps, ExifTags
 import os
-import uuid
 import re
-from io import BytesIO
-from django.core.files.base import ContentFile
-
-def resize_image(image, max_size=(1200, 800), quality=85):
-    """Изменяет размер изображения, сохраняя пропорции и ориентацию."""
-    if not image:
-        return None
-    
-    img = Image.open(image)
-    
-    # Исправляем ориентацию изображения на основе EXIF-данных
-    try:
-        # Получаем EXIF-данные
-        exif = img._getexif()
-        if exif:
-            # Находим тег ориентации
-            for orientation in ExifTags.TAGS.keys():
-                if ExifTags.TAGS[orientation] == 'Orientation':
-                    break
-            
-            # Применяем соответствующее преобразование в зависимости от ориентации
-            if orientation in exif:
-                if exif[orientation] == 2:
-                    img = img.transpose(Image.FLIP_LEFT_RIGHT)
-                elif exif[orientation] == 3:
-                    img = img.transpose(Image.ROTATE_180)
-                elif exif[orientation] == 4:
-                    img = img.transpose(Image.FLIP_TOP_BOTTOM)
-                elif exif[orientation] == 5:
-                    img = img.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_90)
-                elif exif[orientation] == 6:
-                    img = img.transpose(Image.ROTATE_270)
-                elif exif[orientation] == 7:
-                    img = img.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_270)
-                elif exif[orientation] == 8:
-                    img = img.transpose(Image.ROTATE_90)
-    except (AttributeError, KeyError, IndexError):
-        # Игнорируем ошибки, если EXIF-данные отсутствуют или повреждены
-        pass
-    
-    # Если изображение уже меньше максимального размера, не изменяем его
-    if img.width <= max_size[0] and img.height <= max_size[1]:
-        # Сохраняем изображение с правильной ориентацией
-        output = BytesIO()
-        img.save(output, format=img.format or 'JPEG', quality=quality)
-        output.seek(0)
-        return ContentFile(output.read(), name=os.path.basename(image.name))
-    
-    # Сохраняем пропорции
-    img.thumbnail(max_size, Image.LANCZOS)
-    
-    # Сохраняем изображение в буфер
-    output = BytesIO()
-    # Если формат не определен, используем JPEG
-    save_format = img.format or 'JPEG'
-    img.save(output, format=save_format, quality=quality)
-    output.seek(0)
-    
-    # Создаем ContentFile с тем же именем файла
-    return ContentFile(output.read(), name=os.path.basename(image.name))
+import string
+import uuid
+from django.core.files.base import File
+from .images import process_image, variant_path, alternate_path, content_hash
+from .dates import stay_fields
+from .response_cache import bump_versions, place_scopes
+
+def _search_document():
+    """
+    Поисковый документ места: название важнее локации, а та — текста отзыва.
+    Каждое поле индексируется и русской, и английской конфигурацией.
+    """
+    document = None
+    for fields, weight in ((['name'], 'A'), (['location'], 'B'), (['review', 'pros', 'cons'], 'C')):
+        for config in ('russian', 'english'):
+            vector = SearchVector(*fields, config=config, weight=weight)
+            document = vector if document is None else document + vector
+    return document
 
 class Place(models.Model):
     """Модель для логирования мест проживания во время путешествий."""
@@ -77,41 +40,182 @@ class Place(models.Model):
     pros = models.TextField(blank=True, null=True, verbose_name="Что понравилось")
     cons = models.TextField(blank=True, null=True, verbose_name="Что не понравилось")
     dates = models.CharField(max_length=255, blank=True, null=True, verbose_name="Даты пребывания")
+    # Заполняются из dates при сохранении
+    start_date = models.DateField(blank=True, null=True, verbose_name="Дата заезда")
+    end_date = models.DateField(blank=True, null=True, verbose_name="Дата выезда")
+    dates_display = models.CharField(max_length=255, blank=True, default='', verbose_name="Даты для отображения")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата добавления")
+    # Обновляется и при изменении изображений места
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
     slug = models.SlugField(max_length=255, unique=True, blank=True, verbose_name="URL")
+    # Поддерживаются refresh_images при каждом изменении изображений места
+    cover_image = models.ForeignKey(
+        'PlaceImage', on_delete=models.SET_NULL, blank=True, null=True, related_name='+', verbose_name="Обложка",
+    )
+    image_count = models.PositiveIntegerField(default=0, verbose_name="Число изображений")
+    # Вычисляется самой БД при каждой записи строки
+    search_vector = models.GeneratedField(
+        expression=_search_document(),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name="Поисковый индекс",
+    )
+    
+    @classmethod
+    def touch(cls, place_ids):
+        """
+        Отмечает места измененными после записи их изображений в обход
+        сигналов (update, bulk_update): обновляет updated_at и сбрасывает
+        кэш ответов. place_ids может быть и подзапросом.
+        """
+        places = cls.objects.filter(pk__in=place_ids)
+        scopes = []
+        for place in places.values('slug', 'user_id', 'username'):
+            scopes.extend(place_scopes(**place))
+        bump_versions(scopes)
+        places.update(updated_at=timezone.now())
+    
+    # Поля, прежние значения которых нужны сигналам записи места (кэш ответов и сводка профиля)
+    TRACKED_FIELDS = ('slug', 'user_id', 'username', 'rating', 'start_date')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        place = super().from_db(db, field_names, values)
+        place.remember_saved_values()
+        return place
+    
+    def remember_saved_values(self):
+        """Запоминает текущие значения TRACKED_FIELDS как записанные в БД."""
+        if self.get_deferred_fields() & set(self.TRACKED_FIELDS):
+            self._saved_values = None
+        else:
+            self._saved_values = {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+    
+    def saved_values(self):
+        """
+        Значения TRACKED_FIELDS в БД до текущей записи: снимок, сделанный
+        при загрузке или прошлом сохранении, а без него (место загружено
+        не целиком) — из БД. None для места, которого в БД нет.
+        """
+        values = getattr(self, '_saved_values', None)
+        if values is None and self.pk is not None:
+            values = Place.objects.filter(pk=self.pk).values(*self.TRACKED_FIELDS).first()
+        return values
+    
+    # Поля, которые поддерживает refresh_images
+    IMAGE_SUMMARY_FIELDS = ('cover_image', 'image_count')
+    
+    @classmethod
+    def refresh_images(cls, place_ids, **values):
+        """
+        Пересчитывает обложку (первое по порядку изображение) и число
+        изображений мест одним UPDATE; values записываются тем же UPDATE.
+        
+        Вызывается в транзакции, где строки мест уже заблокированы
+        (select_for_update): UPDATE получает снимок данных после блокировки
+        и видит изображения, добавленные параллельными запросами до нее.
+        """
+        images = PlaceImage.objects.filter(place_id=OuterRef('pk')).order_by()
+        return cls.objects.filter(pk__in=place_ids).update(
+            image_count=Coalesce(Subquery(images.values('place_id').annotate(count=Count('id')).values('count')), 0),
+            cover_image=Subquery(images.order_by('order', 'id').values('id')[:1]),
+            **values,
+        )
+    
+    # Сколько раз пробовать сохранение, если тот же slug успел занять параллельный запрос
+    SLUG_ATTEMPTS = 5
+    
+    @staticmethod
+    def base_slug(name):
+        """Slug из названия без проверки уникальности."""
+        # Если название на кириллице, транслитерируем его
+        try:
+            slug = slugify(transliterate.translit(name, 'ru', reversed=True))
+        except:
+            # Если транслитерация не удалась, просто используем slugify
+            slug = slugify(name)
+        # Оставляем место для числового суффикса
+        return slug[:240].strip('-') or 'place'
+    
+    @classmethod
+    def allocate_slugs(cls, bases):
+        """
+        Подбирает свободные slug для списка базовых slug одним запросом.
+        
+        Новый slug получает номер на единицу больше наибольшего в своем
+        ряду: hotel, hotel-2... Наибольший номер каждого ряда считает БД:
+        читаются только slug вида base и base-<число> (условие по префиксу
+        оставлено, чтобы работал индекс для LIKE 'base%'), а в приложение
+        возвращается одна строка. Одинаковые базы в списке получают разные
+        номера. Параллельный запрос может занять тот же slug: вставку нужно
+        повторить при IntegrityError со slug из random_slug(), как это
+        делает save().
+        """
+        if not bases:
+            return []
+        unique_bases = list(dict.fromkeys(bases))
+        aggregates = {}
+        condition = Q()
+        for i, base in enumerate(unique_bases):
+            # Номер не длиннее 18 цифр, чтобы поместиться в bigint
+            numbered = Q(slug__regex=rf'^{re.escape(base)}-[0-9]{{1,18}}$')
+            series = Q(slug__startswith=base) & (Q(slug=base) | numbered)
+            condition |= series
+            aggregates[f"max_{i}"] = Max(
+                Case(
+                    When(slug=base, then=Value(1)),
+                    default=Cast(Substr('slug', len(base) + 2), BigIntegerField()),
+                    output_field=BigIntegerField(),
+                ),
+                filter=series,
+            )
+        maxima = cls.objects.filter(condition).aggregate(**aggregates)
+        
+        next_numbers = {base: (maxima[f"max_{i}"] or 0) + 1 for i, base in enumerate(unique_bases)}
+        slugs = []
+        for base in bases:
+            number = next_numbers[base]
+            next_numbers[base] += 1
+            slugs.append(base if number == 1 else f"{base}-{number}")
+        return slugs
+    
+    @staticmethod
+    def random_slug(base):
+        """
+        Slug со случайным буквенным суффиксом для повторной попытки после гонки:
+        параллельные запросы не выбирают снова один и тот же следующий номер.
+        """
+        return f"{base}-{get_random_string(6, string.ascii_lowercase)}"
     
     def save(self, *args, **kwargs):
-        """Переопределяем метод save для автоматического создания slug."""
-        if not self.slug:
-            # Если название на кириллице, транслитерируем его
-            try:
-                slug = slugify(transliterate.translit(self.name, 'ru', reversed=True))
-            except:
-                # Если транслитерация не удалась, просто используем slugify
-                slug = slugify(self.name)
-            
-            # Проверяем, существует ли уже место с таким slug
-            original_slug = slug
-            counter = 1
-            
-            # Проверяем, существует ли уже место с таким slug
-            while Place.objects.filter(slug=slug).exists():
-                # Если slug уже существует, добавляем к нему уникальный суффикс
-                # Сначала проверяем, есть ли уже числовой суффикс
-                match = re.search(r'(.*?)(\d+)$', original_slug)
-                if match:
-                    # Если есть, увеличиваем его
-                    slug_base = match.group(1)
-                    counter = int(match.group(2)) + 1
-                    slug = f"{slug_base}{counter}"
-                else:
-                    # Если нет, добавляем случайный суффикс
-                    random_suffix = uuid.uuid4().hex[:6]
-                    slug = f"{original_slug}-{random_suffix}"
-            
-            self.slug = slug
+        """Переопределяем метод save для автоматического создания slug и разбора дат."""
+        for field, value in stay_fields(self.dates).items():
+            setattr(self, field, value)
         
-        super().save(*args, **kwargs)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Обложку и число изображений пишет только refresh_images: загруженный
+            # раньше экземпляр не должен затирать их устаревшими значениями
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.name not in self.IMAGE_SUMMARY_FIELDS
+            ]
+        
+        if self.slug:
+            return super().save(*args, **kwargs)
+        
+        base = self.base_slug(self.name)
+        for attempt in range(self.SLUG_ATTEMPTS):
+            self.slug = self.random_slug(base) if attempt else self.allocate_slugs([base])[0]
+            try:
+                # Точка сохранения: неудачная вставка не прерывает внешнюю транзакцию
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Повторяем, только если конфликт именно по slug
+                conflict = Place.objects.filter(slug=self.slug).exists()
+                if not conflict or attempt + 1 == self.SLUG_ATTEMPTS:
+                    self.slug = ''
+                    raise
 
     def __str__(self):
         return self.name
@@ -119,27 +223,329 @@ class Place(models.Model):
     class Meta:
         verbose_name = "Places"
         verbose_name_plural = "Places"
+        indexes = [
+            # Ключ курсорной пагинации списка мест
+            models.Index(fields=['created_at', 'id']),
+            # Фильтры списка: места владельца сразу в порядке пагинации
+            models.Index(fields=['user_id', 'created_at', 'id']),
+            models.Index(fields=['username', 'created_at', 'id']),
+            models.Index(fields=['rating']),
+            models.Index(Upper('location'), name='place_location_upper_idx'),
+            models.Index(fields=['start_date', 'end_date']),
+            # Валидаторы условных запросов к списку
+            models.Index(fields=['updated_at']),
+            # Полнотекстовый поиск и нечеткое совпадение названий
+            GinIndex(fields=['search_vector'], name='place_search_vector_idx'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='place_name_trgm_idx'),
+        ]
         app_label = 'places'  # Явно указываем, что модель принадлежит приложению places
 
-class PlaceImage(models.Model):
+class ProcessedImage(models.Model):
+    """Файлы и метаданные обработанного изображения."""
+    image = models.ImageField(upload_to='places/', verbose_name="Изображение")
+    variants = models.JSONField(default=dict, blank=True, verbose_name="Варианты размеров")
+    formats = models.JSONField(default=dict, blank=True, verbose_name="Дополнительные форматы")
+    placeholder = models.TextField(blank=True, default='', verbose_name="Превью-заглушка (data URI)")
+    width = models.PositiveIntegerField(blank=True, null=True, verbose_name="Ширина, px")
+    height = models.PositiveIntegerField(blank=True, null=True, verbose_name="Высота, px")
+    file_size = models.PositiveIntegerField(blank=True, null=True, verbose_name="Размер файла, байт")
+    taken_at = models.DateTimeField(blank=True, null=True, verbose_name="Дата съемки")
+    orientation = models.PositiveSmallIntegerField(blank=True, null=True, verbose_name="Ориентация EXIF")
+    
+    # Поля, которые заполняет обработка изображения
+    PROCESSED_FIELDS = [
+        'image', 'variants', 'formats', 'placeholder',
+        'width', 'height', 'file_size', 'taken_at', 'orientation',
+    ]
+    
+    def stored_files(self):
+        """Возвращает имена всех файлов изображения: основного, вариантов и копий в других форматах."""
+        names = {self.image.name}
+        for info in (self.formats or {}).values():
+            names.add(info['name'])
+        for variant in (self.variants or {}).values():
+            names.add(variant['name'])
+            for info in (variant.get('formats') or {}).values():
+                names.add(info['name'])
+        return names
+    
+    def _renditions_by_area(self):
+        """Возвращает имена сохраненных версий, от меньшей к большей по площади."""
+        renditions = {variant['name']: variant['width'] * variant['height'] for variant in (self.variants or {}).values()}
+        if self.image.name not in renditions:
+            # Для старых записей без размеров они читаются из заголовка файла
+            width = self.width or self.image.width
+            height = self.height or self.image.height
+            renditions[self.image.name] = width * height
+        return sorted(renditions, key=renditions.get)
+    
+    def largest_rendition(self):
+        """Возвращает имя самой крупной сохраненной версии изображения."""
+        return self._renditions_by_area()[-1]
+    
+    def smallest_rendition(self):
+        """Возвращает имя самой маленькой сохраненной версии изображения."""
+        return self._renditions_by_area()[0]
+    
+    class Meta:
+        abstract = True
+
+class ImageBlob(ProcessedImage):
+    """
+    Обработанное изображение, адресуемое хешем исходных байтов загрузки.
+    
+    Повторная загрузка того же файла (в другое место или после сбоя сети)
+    не обрабатывается заново: новое изображение ссылается на готовые файлы
+    блоба. ref_count — число ссылающихся изображений; блоб и его файлы
+    удаляются, когда ссылок не остается.
+    """
+    content_hash = models.CharField(max_length=64, unique=True, verbose_name="SHA-256 исходника")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Число ссылок")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата добавления")
+    
+    @classmethod
+    def for_uploads(cls, image_files):
+        """
+        Для каждого загруженного файла возвращает пару (хеш содержимого,
+        блоб с тем же содержимым или None). Блобы ищутся одним запросом.
+        """
+        digests = [content_hash(image_file) for image_file in image_files]
+        blobs = cls.objects.in_bulk(set(digests), field_name='content_hash') if digests else {}
+        return [(digest, blobs.get(digest)) for digest in digests]
+    
+    @classmethod
+    def release(cls, blob_id):
+        """Удаляет блоб и его файлы, если на него больше никто не ссылается."""
+        with transaction.atomic():
+            # Блокировка строки не дает параллельной загрузке сослаться
+            # на блоб, пока он удаляется
+            blob = cls.objects.select_for_update().filter(pk=blob_id, ref_count=0).first()
+            if blob is None:
+                return
+            files = blob.stored_files()
+            blob.delete()
+        for name in files:
+            blob.image.storage.delete(name)
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.ref_count})"
+    
+    class Meta:
+        verbose_name = "Image Blob"
+        verbose_name_plural = "Image Blobs"
+        app_label = 'places'
+
+class PlaceImage(ProcessedImage):
     """Модель для хранения изображений мест."""
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PROCESSING, 'Обрабатывается'),
+        (STATUS_READY, 'Готово'),
+        (STATUS_FAILED, 'Ошибка обработки'),
+    ]
+
     place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='images', verbose_name="Место")
-    image = models.ImageField(upload_to='places/', verbose_name="Изображение")
     order = models.PositiveSmallIntegerField(default=0, verbose_name="Порядок отображения")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_READY, verbose_name="Статус обработки")
+    blob = models.ForeignKey(ImageBlob, on_delete=models.SET_NULL, blank=True, null=True, related_name='images', verbose_name="Общий файл")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата добавления")
     
-    def save(self, *args, **kwargs):
-        # Если это новое изображение (еще не сохраненное)
-        if self.pk is None and self.image:
-            # Получаем имя файла
-            filename = os.path.basename(self.image.name)
-            
-            # Изменяем размер изображения
-            resized_image = resize_image(self.image)
+    @staticmethod
+    def processing_options():
+        """Параметры process_image из настроек проекта."""
+        return {
+            'variant_sizes': getattr(settings, 'IMAGE_VARIANTS', {}),
+            'formats': getattr(settings, 'IMAGE_FORMATS', ()),
+        }
+    
+    def process(self, processed=None, upload=None):
+        """
+        Изменяет размер исходного файла, заменяет его обработанной версией
+        и сохраняет варианты размеров из settings.IMAGE_VARIANTS
+        вместе с копиями в форматах из settings.IMAGE_FORMATS.
+        
+        processed — уже готовый результат process_image (например, из пула
+        параллельной обработки), чтобы не обрабатывать файл повторно.
+        
+        Если такой же файл уже загружали, обработка пропускается и
+        изображение ссылается на готовый блоб. upload — пара (хеш, блоб или
+        None) из ImageBlob.for_uploads, чтобы не хешировать файл и не искать
+        блоб повторно.
+        
+        Исходник, уже сохраненный в хранилище, не удаляется: он нужен для
+        повторной попытки, пока строка изображения не записана. Его удаляет
+        вызывающий код после сохранения (см. tasks.run_job).
+        """
+        # Получаем имя файла
+        filename = os.path.basename(self.image.name)
+        
+        if upload is None:
+            digest = content_hash(self.image)
+            upload = (digest, ImageBlob.objects.filter(content_hash=digest).first())
+        digest, blob = upload
+        if blob is not None and self._attach_blob(blob):
+            processed = None
+        else:
+            # Изменяем размер изображения и готовим варианты за одно декодирование
+            if processed is None:
+                processed = process_image(self.image, **self.processing_options())
             
             # Если изображение было изменено, обновляем его
-            if resized_image:
-                self.image.save(filename, resized_image, save=False)
+            if processed:
+                self._store_processed(filename, processed)
+                self._register_blob(digest)
+    
+    def discard_processed(self, source_name):
+        """
+        Отменяет результат process(), который не попал в БД: снимает
+        полученную ссылку на блоб (файлы удалятся вместе с блобом без
+        ссылок) или удаляет собственные новые файлы. Исходник source_name
+        остается в хранилище.
+        """
+        if self.blob_id:
+            blob_id = self.blob_id
+            ImageBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+            transaction.on_commit(lambda: ImageBlob.release(blob_id))
+        elif self.image.name != source_name:
+            for name in self.stored_files() - {source_name}:
+                self.image.storage.delete(name)
+    
+    def _attach_blob(self, blob):
+        """Ссылается на готовый блоб. Возвращает False, если блоб успели удалить."""
+        if not ImageBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1):
+            return False
+        # Имя файла присваиваем отдельно: FieldFile блоба нельзя делить между объектами
+        self.image = blob.image.name
+        for field in self.PROCESSED_FIELDS[1:]:
+            setattr(self, field, getattr(blob, field))
+        self.blob = blob
+        return True
+    
+    def _register_blob(self, digest):
+        """Создает блоб для только что обработанного изображения."""
+        try:
+            with transaction.atomic():
+                self.blob = ImageBlob.objects.create(
+                    content_hash=digest, ref_count=1,
+                    **{field: getattr(self, field) for field in self.PROCESSED_FIELDS}
+                )
+        except IntegrityError:
+            # Такой же файл параллельно обработал другой запрос:
+            # используем его блоб, а свои файлы удаляем
+            blob = ImageBlob.objects.filter(content_hash=digest).first()
+            if blob is not None:
+                own_files = self.stored_files()
+                if self._attach_blob(blob):
+                    for name in own_files - self.stored_files():
+                        self.image.storage.delete(name)
+    
+    def _store_processed(self, filename, processed):
+        """Записывает результат process_image в хранилище и поля модели."""
+        main = processed['main']
+        self.image.save(filename, main['content'], save=False)
+        self.formats = self._store_alternates(self.image.name, main['alternates'])
+        self.variants = self._store_variants(processed['variants'])
+        self.placeholder = processed['placeholder']
+        self.width = main['width']
+        self.height = main['height']
+        self.file_size = main['content'].size
+        # При повторной обработке EXIF уже нет в файле — сохраняем прежние значения
+        metadata = processed['metadata']
+        self.taken_at = metadata['taken_at'] or self.taken_at
+        self.orientation = metadata['orientation'] or self.orientation
+    
+    def _store_alternates(self, name, alternates):
+        """Записывает копии файла в дополнительных форматах рядом с ним."""
+        storage = self.image.storage
+        return {
+            fmt: {'name': storage.save(alternate_path(name, fmt), content), 'bytes': content.size}
+            for fmt, content in alternates.items()
+        }
+    
+    def _store_variants(self, variants):
+        """Записывает варианты размеров в хранилище и возвращает их описание."""
+        storage = self.image.storage
+        stored = {}
+        for variant_name, variant in variants.items():
+            if variant['content'] is None:
+                # Вариант совпадает с основной версией
+                name = self.image.name
+                size = self.file_size
+                formats = self.formats
+            else:
+                name = storage.save(variant_path(self.image.name, variant_name), variant['content'])
+                size = variant['content'].size
+                formats = self._store_alternates(name, variant['alternates'])
+            stored[variant_name] = {
+                'name': name,
+                'width': variant['width'],
+                'height': variant['height'],
+                'bytes': size,
+                'formats': formats,
+            }
+        return stored
+    
+    def reprocess(self):
+        """
+        Повторно обрабатывает уже сохраненное изображение по текущим настройкам.
+        
+        Исходник не хранится, поэтому источником служит самая крупная
+        сохраненная версия. Новые файлы записываются под новыми именами,
+        строка в БД обновляется одним UPDATE только если изображение
+        не изменилось за это время, и лишь затем удаляются старые файлы.
+        Возвращает False, если изображение изменили или удалили параллельно.
+        """
+        storage = self.image.storage
+        old_name = self.image.name
+        old_files = self.stored_files()
+        
+        with storage.open(self.largest_rendition()) as source:
+            processed = process_image(File(source, name=os.path.basename(old_name)), **self.processing_options())
+        
+        self._store_processed(os.path.basename(old_name), processed)
+        new_files = self.stored_files()
+        
+        values = {field: getattr(self, field) for field in self.PROCESSED_FIELDS}
+        with transaction.atomic():
+            if self.blob_id:
+                # Файлы общие: переключаем блоб и все ссылающиеся на него изображения
+                updated = ImageBlob.objects.filter(pk=self.blob_id, image=old_name).update(**values)
+                if updated:
+                    PlaceImage.objects.filter(blob_id=self.blob_id).update(**values)
+            else:
+                updated = PlaceImage.objects.filter(pk=self.pk, image=old_name).update(**values)
+        if not updated:
+            for name in new_files:
+                storage.delete(name)
+            return False
+        
+        # UPDATE не отправляет сигналы: сбрасываем кэш ответов затронутых мест сами
+        images = PlaceImage.objects.filter(blob_id=self.blob_id) if self.blob_id else PlaceImage.objects.filter(pk=self.pk)
+        Place.touch(images.values('place_id'))
+        
+        for name in old_files - new_files:
+            storage.delete(name)
+        return True
+    
+    @classmethod
+    def reorder(cls, place_id, image_ids):
+        """
+        Переставляет изображения места одним UPDATE: порядок изображения
+        равен позиции его ID в image_ids, остальные изображения не меняются.
+        UPDATE не отправляет сигналы: updated_at места и кэш ответов
+        обновляет вызывающий код. Возвращает число обновленных строк.
+        """
+        return cls.objects.filter(place_id=place_id, pk__in=image_ids).update(order=Case(
+            *[When(pk=image_id, then=Value(order)) for order, image_id in enumerate(image_ids)]
+        ))
+    
+    def save(self, *args, processed=None, upload=None, **kwargs):
+        # Если это новое изображение (еще не сохраненное) и его не отложили
+        # для фоновой обработки, обрабатываем его сразу
+        if self.pk is None and self.image and self.status == self.STATUS_READY:
+            self.process(processed, upload)
         
         super().save(*args, **kwargs)
 
@@ -149,5 +555,245 @@ class PlaceImage(models.Model):
     class Meta:
         verbose_name = "Place Image"
         verbose_name_plural = "Place Images"
-        ordering = ['order']
+        # id различает изображения с одинаковым order (каждая загрузка нумерует с нуля)
+        ordering = ['order', 'id']
+        indexes = [models.Index(fields=['place', 'taken_at'])]
         app_label = 'places'  # Явно указываем, что модель принадлежит приложению places
+
+
+class ImageJob(models.Model):
+    """Задание фоновой обработки загруженного изображения."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Выполнено'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    image = models.ForeignKey(PlaceImage, on_delete=models.CASCADE, related_name='jobs', verbose_name="Изображение")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Число попыток")
+    retry_at = models.DateTimeField(blank=True, null=True, verbose_name="Повторная попытка не раньше")
+    error = models.TextField(blank=True, default='', verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="Начало обработки")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="Окончание обработки")
+
+    def __str__(self):
+        return f"Задание {self.id} ({self.status})"
+
+    class Meta:
+        verbose_name = "Image Job"
+        verbose_name_plural = "Image Jobs"
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        app_label = 'places'
+
+
+class UserHandle(models.Model):
+    """Канонический вид имени пользователя в URL профиля (см. canonical)."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+        related_name='handle', verbose_name="Пользователь",
+    )
+    handle = models.CharField(max_length=150, db_index=True, verbose_name="Имя в URL")
+
+    @staticmethod
+    def canonical(username):
+        """Имя для URL так же, как его строит фронтенд: строчные буквы, пробелы заменены дефисами."""
+        return re.sub(r'\s+', '-', username.strip()).lower()
+
+    @classmethod
+    def sync(cls, user):
+        """Создает или обновляет имя в URL пользователя."""
+        cls.objects.update_or_create(user_id=user.pk, defaults={'handle': cls.canonical(user.username)})
+
+    def __str__(self):
+        return self.handle
+
+    class Meta:
+        verbose_name = "User Handle"
+        verbose_name_plural = "User Handles"
+
+
+def _rating_totals(rating):
+    """Вклад рейтинга места в сумму и число оценок сводки."""
+    return (rating, 1) if rating is not None else (0, 0)
+
+
+class ProfileStats(models.Model):
+    """
+    Сводка профиля путешественника. Сигналы мест и изображений прибавляют
+    к счетчикам разницу (apply_changes), а последнюю поездку и обложку
+    пересчитывают тем же UPDATE, только когда они могли смениться. Целиком
+    сводка пересчитывается лишь при первом появлении и командой
+    rebuild_profile_stats. Места принадлежат пользователю по Place.user_id.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+        related_name='profile_stats', verbose_name="Пользователь",
+    )
+    place_count = models.PositiveIntegerField(default=0, verbose_name="Число мест")
+    image_count = models.PositiveIntegerField(default=0, verbose_name="Число изображений")
+    # Средний рейтинг — rating_sum / rated_count: обе величины меняются на разницу
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Сумма рейтингов")
+    rated_count = models.PositiveIntegerField(default=0, verbose_name="Число оценок")
+    last_trip = models.ForeignKey(
+        Place, on_delete=models.SET_NULL, blank=True, null=True, related_name='+', verbose_name="Последняя поездка",
+    )
+    cover_image = models.ForeignKey(
+        PlaceImage, on_delete=models.SET_NULL, blank=True, null=True, related_name='+', verbose_name="Обложка профиля",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата пересчета")
+
+    # Поля, которые вычисляет refresh
+    STATS_FIELDS = ('place_count', 'image_count', 'rating_sum', 'rated_count', 'last_trip_id', 'cover_image_id')
+    # Счетчики, к которым apply_changes прибавляет разницу
+    COUNTERS = ('place_count', 'image_count', 'rating_sum', 'rated_count')
+    # Поля, которые apply_changes пересчитывает запросом
+    LATEST_FIELDS = ('last_trip', 'cover_image')
+
+    @property
+    def average_rating(self):
+        return round(self.rating_sum / self.rated_count, 2) if self.rated_count else None
+
+    @staticmethod
+    def latest(user_id):
+        """Упорядоченные ID для last_trip и cover_image: последняя поездка — самая поздняя по дате заезда."""
+        return {
+            'last_trip': Place.objects.filter(user_id=str(user_id)).order_by(
+                F('start_date').desc(nulls_last=True), F('created_at').desc(),
+            ).values_list('id', flat=True),
+            # Обложка — первое изображение самой поздней поездки с фотографиями
+            'cover_image': PlaceImage.objects.filter(place__user_id=str(user_id)).order_by(
+                F('place__start_date').desc(nulls_last=True), F('place__created_at').desc(), 'order', 'id',
+            ).values_list('id', flat=True),
+        }
+
+    @classmethod
+    def compute(cls, user_id):
+        """Значения сводки по местам пользователя целиком."""
+        totals = Place.objects.filter(user_id=str(user_id)).aggregate(
+            place_count=Count('id'), rating_sum=Coalesce(Sum('rating'), 0), rated_count=Count('rating'),
+        )
+        latest = cls.latest(user_id)
+        return {
+            **totals,
+            'image_count': PlaceImage.objects.filter(place__user_id=str(user_id)).count(),
+            'last_trip_id': latest['last_trip'].first(),
+            'cover_image_id': latest['cover_image'].first(),
+        }
+
+    @classmethod
+    def refresh(cls, user_ids):
+        """
+        Пересчитывает сводки пользователей с указанными Place.user_id.
+        ID, не соответствующие пользователю, пропускаются.
+        Возвращает число сводок, которые изменились.
+        """
+        user_model = cls._meta.get_field('user').related_model
+        ids = {int(user_id) for user_id in user_ids if user_id and str(user_id).isdigit()}
+        existing = {stats.pk: stats for stats in cls.objects.filter(pk__in=ids)}
+        changed = 0
+        for user_id in user_model.objects.filter(pk__in=ids).values_list('pk', flat=True):
+            values = cls.compute(user_id)
+            stats = existing.get(user_id)
+            if stats is not None and all(getattr(stats, field) == value for field, value in values.items()):
+                continue
+            cls.objects.update_or_create(user_id=user_id, defaults=values)
+            changed += 1
+        return changed
+
+    @classmethod
+    def place_changes(cls, place, previous=None, deleted=False):
+        """
+        Изменения сводок от записи места: previous — значения до нее
+        (Place.saved_values), None для нового места. Возвращает список
+        (user_id, разница счетчиков, пересчитываемые поля, поля для заполнения)
+        для apply_changes.
+        """
+        rating_sum, rated_count = _rating_totals(place.rating)
+        if deleted:
+            # Последнюю поездку и обложку из удаленного места обнулил SET_NULL:
+            # только тогда их нужно искать заново
+            return [(place.user_id, {
+                'place_count': -1, 'image_count': -place.image_count,
+                'rating_sum': -rating_sum, 'rated_count': -rated_count,
+            }, (), cls.LATEST_FIELDS)]
+        if previous is None:
+            # У нового места еще нет изображений: обложка не меняется
+            return [(place.user_id, {
+                'place_count': 1, 'rating_sum': rating_sum, 'rated_count': rated_count,
+            }, ('last_trip',), ())]
+
+        old_sum, old_count = _rating_totals(previous['rating'])
+        if previous['user_id'] != place.user_id:
+            # Место переходит к другому владельцу вместе с изображениями
+            images = PlaceImage.objects.filter(place_id=place.pk).count()
+            return [
+                (previous['user_id'], {
+                    'place_count': -1, 'image_count': -images, 'rating_sum': -old_sum, 'rated_count': -old_count,
+                }, cls.LATEST_FIELDS, ()),
+                (place.user_id, {
+                    'place_count': 1, 'image_count': images, 'rating_sum': rating_sum, 'rated_count': rated_count,
+                }, cls.LATEST_FIELDS, ()),
+            ]
+        # От даты заезда зависит порядок поездок, а значит и обложка
+        recompute = cls.LATEST_FIELDS if previous['start_date'] != place.start_date else ()
+        return [(place.user_id, {'rating_sum': rating_sum - old_sum, 'rated_count': rated_count - old_count}, recompute, ())]
+
+    @classmethod
+    def apply_changes(cls, changes):
+        """
+        Применяет изменения (см. place_changes), сложенные по владельцам:
+        один UPDATE на сводку — счетчики через F() + разница, поля из
+        LATEST_FIELDS подзапросом. Поля для заполнения ищутся, только если
+        пусты. Сводка, которой еще нет, собирается целиком (refresh).
+        Вызывается в транзакции, где записаны сами изменения.
+        """
+        merged = {}
+        for user_id, deltas, recompute, fill in changes:
+            if not user_id or not str(user_id).isdigit():
+                continue
+            entry = merged.setdefault(int(user_id), ({}, set(), set()))
+            for field, delta in deltas.items():
+                entry[0][field] = entry[0].get(field, 0) + delta
+            entry[1].update(recompute)
+            entry[2].update(fill)
+
+        for user_id, (deltas, recompute, fill) in merged.items():
+            values = {}
+            for field, delta in deltas.items():
+                if delta > 0:
+                    values[field] = F(field) + delta
+                elif delta < 0:
+                    # Счетчик неотрицательный: расхождение исправит rebuild_profile_stats
+                    values[field] = Greatest(F(field) + delta, 0)
+            latest = cls.latest(user_id)
+            for field in recompute:
+                values[f"{field}_id"] = Subquery(latest[field][:1])
+            for field in fill - recompute:
+                values[f"{field}_id"] = Coalesce(F(f"{field}_id"), Subquery(latest[field][:1]))
+            if not values:
+                continue
+            if cls.objects.filter(pk=user_id).update(updated_at=timezone.now(), **values):
+                continue
+            try:
+                # Сводки еще нет: собираем ее по текущим данным транзакции
+                with transaction.atomic():
+                    cls.refresh([user_id])
+            except IntegrityError:
+                # Сводку только что создал параллельный запрос, не видевший этих изменений
+                cls.objects.filter(pk=user_id).update(updated_at=timezone.now(), **values)
+
+    def __str__(self):
+        return f"Сводка профиля {self.user_id}"
+
+    class Meta:
+        verbose_name = "Profile Stats"
+        verbose_name_plural = "Profile Stats"
@@ -0,0 +1,117 @@
+"""
+Постраничная выдача списка мест по курсору.
+
+Страницы выбираются по ключу (created_at, id) от новых к старым, без
+OFFSET: следующая страница начинается строго после последней записи
+предыдущей, поэтому стоимость запроса не растет с номером страницы,
+а новые места не сдвигают уже выданные страницы.
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PlaceCursorPagination(BasePagination):
+    """Курсорная пагинация по (created_at, id) в порядке убывания."""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'PLACES_PAGE_SIZE', 20)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        if requested > 0:
+            return min(requested, getattr(settings, 'PLACES_MAX_PAGE_SIZE', 100))
+        return page_size
+
+    def encode_cursor(self, instance):
+        # Страница может состоять из моделей или из словарей values()
+        if isinstance(instance, dict):
+            created_at, pk = instance['created_at'], instance['id']
+        else:
+            created_at, pk = instance.created_at, instance.pk
+        position = f"{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        """Возвращает (created_at, id) из параметра cursor или None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            # Диапазон по created_at использует индекс, а равные created_at
+            # отсекаются по id — получается сравнение кортежей (created_at, id)
+            queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+
+        # Лишняя запись показывает, есть ли следующая страница
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class PlaceSearchPagination(PageNumberPagination):
+    """
+    Постраничная выдача результатов поиска.
+    
+    Результаты упорядочены по релевантности, у которой нет устойчивого
+    ключа для курсора, а глубоко в выдачу поиска не листают — поэтому
+    здесь используются обычные номера страниц.
+    """
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        self.page_size = getattr(settings, 'PLACES_PAGE_SIZE', 20)
+        self.max_page_size = getattr(settings, 'PLACES_MAX_PAGE_SIZE', 100)
+        return super().get_page_size(request)
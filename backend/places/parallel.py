@@ -0,0 +1,96 @@
+"""
+Параллельная обработка файлов одной загрузки.
+
+Pillow отпускает GIL при декодировании и кодировании, поэтому файлы
+одной загрузки можно обрабатывать в пуле потоков (или процессов).
+Пулы общие для всего процесса и ограничены IMAGE_MAX_CONCURRENCY,
+а одна загрузка занимает не больше IMAGE_UPLOAD_WORKERS слотов, чтобы
+большой пакет не вытеснял другие запросы.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import File
+
+from .images import process_image
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def executor_kind():
+    """Возвращает режим обработки загрузок: serial, thread или process."""
+    return getattr(settings, 'IMAGE_UPLOAD_EXECUTOR', 'serial')
+
+
+def _get_executor(kind):
+    """Лениво создает общий пул нужного типа."""
+    with _executors_lock:
+        if kind not in _executors:
+            max_workers = getattr(settings, 'IMAGE_MAX_CONCURRENCY', 8)
+            if kind == 'process':
+                # spawn безопаснее fork в многопоточном WSGI-процессе
+                _executors[kind] = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            else:
+                _executors[kind] = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix='upload-worker',
+                )
+        return _executors[kind]
+
+
+def _process_bytes(data, name, options):
+    """Точка входа для пула процессов: файлы загрузки не сериализуются, байты — да."""
+    return process_image(File(BytesIO(data), name=name), **options)
+
+
+def _submit(executor, kind, image_file, options):
+    if kind == 'process':
+        image_file.seek(0)
+        return executor.submit(_process_bytes, image_file.read(), image_file.name, options)
+    return executor.submit(process_image, image_file, **options)
+
+
+def process_uploads(image_files, options):
+    """
+    Обрабатывает файлы и возвращает результаты process_image в исходном порядке.
+
+    На месте файла, обработка которого завершилась ошибкой, возвращается
+    исключение: решение о том, как сообщить об ошибке, остается за вызывающим.
+    """
+    kind = executor_kind()
+    if kind not in ('thread', 'process') or len(image_files) < 2:
+        results = []
+        for image_file in image_files:
+            try:
+                results.append(process_image(image_file, **options))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    executor = _get_executor(kind)
+    window = max(1, getattr(settings, 'IMAGE_UPLOAD_WORKERS', 4))
+    results = [None] * len(image_files)
+    pending = {}
+    next_index = 0
+
+    # Держим в работе не больше window файлов этой загрузки одновременно
+    while next_index < len(image_files) or pending:
+        while next_index < len(image_files) and len(pending) < window:
+            future = _submit(executor, kind, image_files[next_index], options)
+            pending[future] = next_index
+            next_index += 1
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = e
+    return results
@@ -0,0 +1,129 @@
+"""
+Кэш ответов списка и карточки мест.
+
+Ключ ответа включает номер версии: карточка — версию места, список —
+версию владельца (если список отфильтрован по владельцу) или общую версию
+всех мест. Запись места или его изображений увеличивает эти версии, после
+чего старые ответы просто перестают запрашиваться и вытесняются бэкендом.
+
+Бэкенд задается алиасом PLACES_CACHE_ALIAS в settings.CACHES, поэтому
+подходит любой кэш Django: locmem и файловый для разработки и тестов,
+Redis (или совместимый) в продакшене.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+STATS_KEYS = {'hit': 'places:stats:hits', 'miss': 'places:stats:misses'}
+
+
+def _cache():
+    return caches[getattr(settings, 'PLACES_CACHE_ALIAS', 'places')]
+
+
+def _version_key(scope):
+    return f"places:version:{scope}"
+
+
+def _initial_version():
+    # Версия, созданная заново после вытеснения, не должна совпасть со
+    # старой: начинаем с текущего времени в микросекундах
+    return time.time_ns() // 1000
+
+
+def get_version(scope):
+    """Возвращает текущую версию области кэша, создавая ее при необходимости."""
+    cache = _cache()
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def place_scopes(slug=None, user_id=None, username=None):
+    """Области кэша, которые затрагивает изменение места."""
+    scopes = ['all']
+    if slug:
+        scopes.append(f"place:{slug}")
+    if user_id:
+        scopes.append(f"user_id:{user_id}")
+    if username:
+        scopes.append(f"username:{username}")
+    return scopes
+
+
+def bump_versions(scopes):
+    """Увеличивает версии областей после фиксации текущей транзакции."""
+    def bump():
+        cache = _cache()
+        for scope in scopes:
+            key = _version_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Версии нет в кэше: новая начальная версия больше прежних
+                cache.add(key, _initial_version(), timeout=None)
+    # До фиксации параллельный запрос мог бы закэшировать старые данные под новой версией
+    transaction.on_commit(bump)
+
+
+def _count(outcome):
+    cache = _cache()
+    try:
+        cache.incr(STATS_KEYS[outcome])
+    except ValueError:
+        cache.add(STATS_KEYS[outcome], 1, timeout=None)
+
+
+def stats():
+    """Возвращает счетчики попаданий и промахов (общие для всех процессов)."""
+    values = _cache().get_many(STATS_KEYS.values())
+    hits = values.get(STATS_KEYS['hit'], 0)
+    misses = values.get(STATS_KEYS['miss'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+        'backend': _cache().__class__.__name__,
+    }
+
+
+def response_key(kind, request, scope):
+    """Ключ ответа: вид, версия области и полный URL запроса (с хостом и параметрами)."""
+    version = get_version(scope)
+    if version is None:
+        return None
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f"places:{kind}:{scope}:{version}:{url}"
+
+
+def cached_response(key, build):
+    """
+    Возвращает закэшированный ответ по ключу или строит его через build().
+    
+    Кэшируются только данные успешных ответов; заголовок X-Cache
+    показывает, был ли ответ взят из кэша.
+    """
+    if key is None:
+        return build()
+    cache = _cache()
+    data = cache.get(key)
+    if data is not None:
+        _count('hit')
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    _count('miss')
+    response = build()
+    if response.status_code == 200:
+        cache.set(key, response.data, timeout=getattr(settings, 'PLACES_CACHE_TIMEOUT', 3600))
+    response['X-Cache'] = 'MISS'
+    return response
@@ -0,0 +1,74 @@
+"""
+Поиск мест.
+
+Полнотекстовая часть работает по сгенерированному столбцу
+Place.search_vector (GIN-индекс), нечеткая — по триграммам названия
+(pg_trgm, GIN-индекс gin_trgm_ops) и ловит опечатки. Запрос дополнительно
+транслитерируется в обе стороны, чтобы «Moskva» находило «Москва» и наоборот.
+"""
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity,
+)
+from django.db.models import F, Q, TextField, Value
+from django.db.models.functions import Concat, Greatest
+import transliterate
+
+# Разметка совпадений во фрагментах
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+
+def _spellings(query):
+    """Возвращает запрос и его транслитерации без повторов."""
+    spellings = [query]
+    for reversed_ in (False, True):
+        try:
+            spelling = transliterate.translit(query, 'ru', reversed=reversed_)
+        except Exception:
+            continue
+        if spelling not in spellings:
+            spellings.append(spelling)
+    return spellings
+
+
+def search_places(queryset, query):
+    """
+    Фильтрует и упорядочивает места по релевантности запросу.
+    
+    Каждое место получает rank (полнотекстовый ранг плюс триграммное
+    сходство названия), headline (название с выделенными совпадениями)
+    и snippet (выделенный фрагмент отзыва).
+    """
+    spellings = _spellings(query)
+    text_query = None
+    for spelling in spellings:
+        for config in ('russian', 'english'):
+            part = SearchQuery(spelling, config=config, search_type='websearch')
+            text_query = part if text_query is None else text_query | part
+
+    if len(spellings) > 1:
+        similarity = Greatest(*(TrigramWordSimilarity(spelling, 'name') for spelling in spellings))
+    else:
+        similarity = TrigramWordSimilarity(query, 'name')
+    fuzzy = Q()
+    for spelling in spellings:
+        fuzzy |= Q(name__trigram_word_similar=spelling)
+
+    highlight = {
+        'config': 'russian',
+        'start_sel': HIGHLIGHT_START,
+        'stop_sel': HIGHLIGHT_STOP,
+    }
+    return (
+        queryset
+        .filter(Q(search_vector=text_query) | fuzzy)
+        .annotate(rank=SearchRank(F('search_vector'), text_query) + similarity)
+        .annotate(
+            headline=SearchHeadline('name', text_query, highlight_all=True, **highlight),
+            snippet=SearchHeadline(
+                Concat('review', Value(' '), 'pros', Value(' '), 'cons', output_field=TextField()),
+                text_query, max_words=30, min_words=10, **highlight,
+            ),
+        )
+        .order_by('-rank', '-id')
+    )
@@ -1,21 +1,45 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Place, PlaceImage
+from .models import Place, PlaceImage, ImageJob, ProfileStats
 from django.conf import settings
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для пользователей."""
+    stats = serializers.SerializerMethodField()
+    
     class Meta:
         model = User
-        fields = ['id', 'username', 'first_name', 'last_name', 'email']
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'stats']
+    
+    def get_stats(self, user):
+        """Сводка профиля; у пользователя без мест — нулевая."""
+        try:
+            stats = user.profile_stats
+        except ProfileStats.DoesNotExist:
+            stats = ProfileStats()
+        return ProfileStatsSerializer(stats, context=self.context).data
 
 class PlaceImageSerializer(serializers.ModelSerializer):
     """Сериализатор для изображений мест."""
     image_url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = PlaceImage
-        fields = ['id', 'image', 'order', 'image_url']
+        fields = [
+            'id', 'image', 'order', 'image_url', 'status', 'variants', 'srcset', 'placeholder',
+            'width', 'height', 'file_size', 'taken_at', 'orientation',
+        ]
+        read_only_fields = ['status', 'placeholder', 'width', 'height', 'file_size', 'taken_at', 'orientation']
+        
+    def _build_url(self, name):
+        """Формирует полный URL файла из хранилища."""
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(f"{settings.MEDIA_URL}{name}")
+        # Если request не доступен, формируем URL вручную
+        return f"{settings.MEDIA_URL}{name}"
         
     def get_image_url(self, obj):
         """Получаем полный URL изображения."""
@@ -27,8 +51,97 @@ class PlaceImageSerializer(serializers.ModelSerializer):
                 # Если request не доступен, формируем URL вручную
                 return f"{settings.MEDIA_URL}{obj.image}"
         return None
+    
+    def get_variants(self, obj):
+        """Возвращает варианты размеров: имя -> URL и размеры."""
+        return {
+            variant_name: {
+                'url': self._build_url(variant['name']),
+                'width': variant['width'],
+                'height': variant['height'],
+            }
+            for variant_name, variant in (obj.variants or {}).items()
+        }
+    
+    def get_srcset(self, obj):
+        """Возвращает строку для атрибута srcset, от меньшего варианта к большему."""
+        candidates = {}
+        for variant in (obj.variants or {}).values():
+            candidates[variant['width']] = variant['name']
+        if not candidates:
+            return None
+        return ', '.join(
+            f"{self._build_url(name)} {width}w" for width, name in sorted(candidates.items())
+        )
+
+class ImageJobSerializer(serializers.ModelSerializer):
+    """Сериализатор для заданий фоновой обработки изображений."""
+    image = PlaceImageSerializer(read_only=True)
 
-class PlaceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageJob
+        fields = ['id', 'status', 'attempts', 'error', 'created_at', 'started_at', 'finished_at', 'image']
+        read_only_fields = fields
+
+class PlaceImageCoverSerializer(PlaceImageSerializer):
+    """Компактное представление обложки места для списков."""
+    class Meta(PlaceImageSerializer.Meta):
+        fields = ['id', 'image_url', 'srcset', 'placeholder', 'width', 'height']
+
+class ProfileStatsSerializer(serializers.ModelSerializer):
+    """Сводка профиля путешественника."""
+    last_trip = serializers.SerializerMethodField()
+    cover_image = PlaceImageCoverSerializer(read_only=True)
+    
+    class Meta:
+        model = ProfileStats
+        fields = ['place_count', 'image_count', 'average_rating', 'last_trip', 'cover_image']
+    
+    def get_last_trip(self, stats):
+        place = stats.last_trip
+        if place is None:
+            return None
+        return {
+            'id': place.id,
+            'slug': place.slug,
+            'name': place.name,
+            'location': place.location,
+            # Как PlaceSerializer.to_representation: отформатированный диапазон
+            'dates': (place.dates_display or place.dates) if place.dates else place.dates,
+        }
+
+class SparseFieldsetsMixin:
+    """
+    Выбор полей ответа параметрами запроса ?fields= и ?expand=.
+    
+    По умолчанию отдаются поля Meta.default_fields (или все Meta.fields).
+    fields=a,b заменяет этот набор, expand=c добавляет к нему необязательные
+    поля. Неизвестные имена игнорируются. Применяется только к чтению.
+    """
+    @classmethod
+    def selected_fields(cls, params):
+        available = cls.Meta.fields
+        requested = params.get('fields')
+        if requested:
+            selected = {name.strip() for name in requested.split(',')}
+        else:
+            selected = set(getattr(cls.Meta, 'default_fields', available))
+        expand = params.get('expand')
+        if expand:
+            selected |= {name.strip() for name in expand.split(',')}
+        return [name for name in available if name in selected]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        selected = set(self.selected_fields(request.query_params))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+class PlaceSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Сериализатор для мест проживания."""
     images = PlaceImageSerializer(many=True, read_only=True)
     dates = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
@@ -43,60 +156,17 @@ class PlaceSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Place
-        fields = ['id', 'user_id', 'username', 'name', 'location', 'rating', 'review', 'pros', 'cons', 'dates', 'images', 'slug']
-        read_only_fields = ['id', 'slug', 'created_at']
-        
-    def _format_month_ru(self, month_number):
-        """Возвращает название месяца на русском языке."""
-        months = {
-            1: 'янв',
-            2: 'фев',
-            3: 'мар',
-            4: 'апр',
-            5: 'май',
-            6: 'июн',
-            7: 'июл',
-            8: 'авг',
-            9: 'сен',
-            10: 'окт',
-            11: 'ноя',
-            12: 'дек'
-        }
-        return months.get(month_number, '')
+        fields = [
+            'id', 'user_id', 'username', 'name', 'location', 'rating', 'review', 'pros', 'cons',
+            'dates', 'start_date', 'end_date', 'images', 'slug',
+        ]
+        read_only_fields = ['id', 'slug', 'created_at', 'start_date', 'end_date']
         
     def to_representation(self, instance):
-        """Преобразование объекта в словарь с форматированием дат."""
+        """Преобразование объекта в словарь: даты отдаются в заранее отформатированном виде."""
         data = super().to_representation(instance)
-        
-        # Если есть даты, пробуем их отформатировать
         if data.get('dates'):
-            try:
-                # Разбираем даты
-                dates = data['dates']
-                
-                # Если даты в формате DD.MM.YYYY – DD.MM.YYYY
-                if '.' in dates:
-                    from datetime import datetime
-                    parts = dates.split('–')
-                    if len(parts) == 2:
-                        start_date = datetime.strptime(parts[0].strip(), '%d.%m.%Y')
-                        end_date = datetime.strptime(parts[1].strip(), '%d.%m.%Y')
-                        
-                        # Если один и тот же месяц
-                        if start_date.month == end_date.month and start_date.year == end_date.year:
-                            formatted_dates = f"{start_date.day}–{end_date.day} {self._format_month_ru(end_date.month)} {end_date.year}"
-                        # Если разные месяцы, но один год
-                        elif start_date.year == end_date.year:
-                            formatted_dates = f"{start_date.day} {self._format_month_ru(start_date.month)} – {end_date.day} {self._format_month_ru(end_date.month)} {end_date.year}"
-                        # Если разные годы
-                        else:
-                            formatted_dates = f"{start_date.day} {self._format_month_ru(start_date.month)} {start_date.year} – {end_date.day} {self._format_month_ru(end_date.month)} {end_date.year}"
-                        
-                        data['dates'] = formatted_dates
-            except Exception as e:
-                # В случае ошибки оставляем как есть
-                pass
-        
+            data['dates'] = instance.dates_display or data['dates']
         return data
         
     def create(self, validated_data):
@@ -126,4 +196,29 @@ class PlaceSerializer(serializers.ModelSerializer):
         instance.dates = dates
         instance.save()
         
-        return instance
\ No newline at end of file
+        return instance
+
+class PlaceListSerializer(PlaceSerializer):
+    """
+    Компактный сериализатор списка мест: обложка и число изображений
+    вместо всех изображений, без длинных текстов. Остальные поля
+    запрашиваются через ?expand=.
+    """
+    cover_image = PlaceImageCoverSerializer(read_only=True)
+    image_count = serializers.IntegerField(read_only=True)
+    
+    class Meta(PlaceSerializer.Meta):
+        fields = PlaceSerializer.Meta.fields + ['created_at', 'updated_at', 'cover_image', 'image_count']
+        default_fields = [
+            'id', 'user_id', 'username', 'name', 'location', 'rating', 'dates', 'start_date', 'end_date',
+            'slug', 'created_at', 'updated_at', 'cover_image', 'image_count',
+        ]
+
+class PlaceSearchSerializer(PlaceSerializer):
+    """Сериализатор результата поиска: место с рангом и выделенными совпадениями."""
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+    snippet = serializers.CharField(read_only=True, allow_null=True)
+
+    class Meta(PlaceSerializer.Meta):
+        fields = PlaceSerializer.Meta.fields + ['rank', 'headline', 'snippet']
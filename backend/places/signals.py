@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import handles
+from .models import ImageBlob, Place, PlaceImage, ProfileStats, UserHandle
+from .response_cache import bump_versions, place_scopes
+
+
+@receiver(post_delete, sender=PlaceImage)
+def release_image_blob(sender, instance, **kwargs):
+    """Снимает ссылку удаленного изображения с блоба и удаляет блоб без ссылок."""
+    blob_id = instance.blob_id
+    if blob_id is None:
+        return
+    ImageBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+    # Файлы удаляем только после фиксации: при откате они еще нужны
+    transaction.on_commit(lambda: ImageBlob.release(blob_id))
+
+
+@receiver(pre_save, sender=Place)
+def remember_place_owner(sender, instance, **kwargs):
+    """
+    Запоминает прежние значения места: при смене владельца меняются списки
+    и сводки обоих. Значения берутся из снимка, сделанного при загрузке
+    (Place.saved_values), без лишнего запроса к БД.
+    """
+    instance._previous = instance.saved_values() if instance.pk is not None else None
+    instance._previous_scopes = []
+    if instance._previous:
+        previous = instance._previous
+        instance._previous_scopes = place_scopes(previous['slug'], previous['user_id'], previous['username'])
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_place_responses(sender, instance, **kwargs):
+    """Сбрасывает закэшированные ответы с этим местом."""
+    scopes = place_scopes(instance.slug, instance.user_id, instance.username)
+    for scope in getattr(instance, '_previous_scopes', []):
+        if scope not in scopes:
+            scopes.append(scope)
+    bump_versions(scopes)
+
+
+@receiver(post_save, sender=Place)
+def count_saved_place(sender, instance, created, **kwargs):
+    """Прибавляет изменения места к сводке владельца (и прежнего владельца при его смене)."""
+    previous = None if created else getattr(instance, '_previous', None)
+    ProfileStats.apply_changes(ProfileStats.place_changes(instance, previous))
+    instance.remember_saved_values()
+
+
+@receiver(post_delete, sender=Place)
+def count_deleted_place(sender, instance, **kwargs):
+    """Вычитает удаленное место и его изображения из сводки владельца."""
+    ProfileStats.apply_changes(ProfileStats.place_changes(instance, deleted=True))
+
+
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_delete, sender=PlaceImage)
+def touch_image_place(sender, instance, **kwargs):
+    """
+    Изображения входят в ответы места: пересчитываем его обложку и число
+    изображений, обновляем updated_at и сбрасываем кэш. Новое или удаленное
+    изображение меняет и число изображений и обложку в сводке профиля
+    владельца; прочие записи (статус обработки) сводку не затрагивают.
+    
+    Пропускается, если место удаляется вместе с изображениями (кэш и
+    сводку обновляют сигналы самого места) или вызывающий код пересчитает
+    место сам после серии сохранений (defer_place_refresh).
+    """
+    origin = kwargs.get('origin')
+    if isinstance(origin, Place) or getattr(origin, 'model', None) is Place:
+        return
+    if getattr(instance, 'defer_place_refresh', False):
+        return
+    deleted = kwargs['signal'] is post_delete
+    with transaction.atomic():
+        # Блокировка места упорядочивает пересчеты параллельных загрузок
+        place = Place.objects.select_for_update().filter(pk=instance.place_id).values('slug', 'user_id', 'username').first()
+        if place:
+            Place.refresh_images([instance.place_id], updated_at=timezone.now())
+            if deleted:
+                # Обложку профиля из удаленного изображения обнулил SET_NULL
+                ProfileStats.apply_changes([(place['user_id'], {'image_count': -1}, (), ('cover_image',))])
+            elif kwargs.get('created'):
+                ProfileStats.apply_changes([(place['user_id'], {'image_count': 1}, ('cover_image',), ())])
+    if place:
+        bump_versions(place_scopes(**place))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_user_handle(sender, instance, created, update_fields=None, **kwargs):
+    """Поддерживает имя пользователя в URL; сохранения без username пропускаются (например, last_login)."""
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    UserHandle.sync(instance)
+    handles.forget_username(instance.username)
@@ -0,0 +1,180 @@
+"""
+Фоновая обработка изображений.
+
+Очередь хранится в базе данных (модель ImageJob) и заменяет внешний брокер:
+задания переживают перезапуск процесса, а несколько процессов могут
+разбирать очередь одновременно благодаря SELECT ... FOR UPDATE SKIP LOCKED.
+Внутри процесса задания выполняет небольшой пул потоков.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ImageJob, PlaceImage
+
+logger = logging.getLogger(__name__)
+
+# Максимальное число попыток обработки одного изображения
+MAX_ATTEMPTS = 3
+
+# Пауза перед повторной попыткой; удваивается с каждой неудачей
+RETRY_BACKOFF = timedelta(seconds=30)
+
+# Через сколько времени зависшее задание (например, после падения воркера)
+# снова становится доступным для обработки
+STALE_AFTER = timedelta(minutes=10)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def queue_enabled():
+    """Возвращает True, если изображения обрабатываются через очередь."""
+    return getattr(settings, 'IMAGE_PROCESSING_MODE', 'sync') == 'queue'
+
+
+def _get_executor():
+    """Лениво создает пул потоков текущего процесса."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+                thread_name_prefix='image-worker',
+            )
+        return _executor
+
+
+def enqueue_image(image):
+    """Ставит сохраненное изображение в очередь на обработку."""
+    job = ImageJob.objects.create(image=image)
+    # Будим воркер только после фиксации транзакции, иначе он не увидит задание
+    transaction.on_commit(kick_workers)
+    return job
+
+
+def kick_workers():
+    """Запускает разбор очереди в пуле потоков текущего процесса."""
+    _get_executor().submit(_drain_in_thread)
+
+
+def _kick_workers_later(delay):
+    """Будит воркеры процесса, когда отложенное задание станет доступным."""
+    timer = threading.Timer(delay.total_seconds(), kick_workers)
+    timer.daemon = True
+    timer.start()
+
+
+def _drain_in_thread():
+    """Точка входа потока пула: разбирает очередь и закрывает соединения."""
+    close_old_connections()
+    try:
+        drain_queue()
+    except Exception:
+        logger.exception("Ошибка воркера обработки изображений")
+    finally:
+        close_old_connections()
+
+
+def claim_next_job():
+    """Атомарно забирает следующее задание из очереди или возвращает None."""
+    now = timezone.now()
+    stale_before = now - STALE_AFTER
+    with transaction.atomic():
+        job = (
+            ImageJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ImageJob.STATUS_PENDING) & (Q(retry_at__isnull=True) | Q(retry_at__lte=now))
+                | Q(status=ImageJob.STATUS_RUNNING, started_at__lt=stale_before)
+            )
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ImageJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.attempts = F('attempts') + 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    job.refresh_from_db(fields=['attempts'])
+    return job
+
+
+def run_job(job):
+    """
+    Обрабатывает изображение задания и фиксирует результат.
+    
+    Исходник удаляется только после записи строки изображения: до этого
+    он нужен повторной попытке. Если изображение удалили во время
+    обработки, полученная ссылка на блоб снимается, а файлы удаляются.
+    """
+    try:
+        image = PlaceImage.objects.get(pk=job.image_id)
+    except PlaceImage.DoesNotExist:
+        # Изображение удалили, пока задание ждало в очереди
+        ImageJob.objects.filter(pk=job.pk).delete()
+        return
+    source_name = image.image.name
+    
+    try:
+        image.process()
+        image.status = PlaceImage.STATUS_READY
+        with transaction.atomic():
+            # Блокировка строки: удаление не вклинится между проверкой и записью
+            exists = PlaceImage.objects.select_for_update().filter(pk=image.pk).exists()
+            if exists:
+                image.save(update_fields=PlaceImage.PROCESSED_FIELDS + ['blob', 'status'])
+    except Exception as e:
+        logger.error(f"Ошибка обработки изображения {job.image_id}: {str(e)}")
+        image.discard_processed(source_name)
+        _fail_attempt(job, e)
+        return
+    
+    if not exists:
+        # Изображение удалили во время обработки: задание удалено каскадом
+        image.discard_processed(source_name)
+        image.image.storage.delete(source_name)
+        return
+    
+    # Строка записана: исходник больше не нужен
+    if source_name != image.image.name:
+        image.image.storage.delete(source_name)
+    # update(), а не save(): задание могло быть удалено каскадом вместе с изображением
+    ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.STATUS_DONE, error='', finished_at=timezone.now())
+
+
+def _fail_attempt(job, error):
+    """Откладывает повтор неудачного задания или помечает его и изображение ошибкой."""
+    jobs = ImageJob.objects.filter(pk=job.pk)
+    if job.attempts < MAX_ATTEMPTS:
+        delay = RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        if jobs.update(status=ImageJob.STATUS_PENDING, error=str(error), retry_at=timezone.now() + delay):
+            _kick_workers_later(delay)
+        return
+    
+    with transaction.atomic():
+        failed = PlaceImage.objects.select_for_update().filter(pk=job.image_id).first()
+        if failed is not None:
+            failed.status = PlaceImage.STATUS_FAILED
+            # save(), а не update(): сигнал обновит updated_at места и сбросит кэш ответов
+            failed.save(update_fields=['status'])
+    jobs.update(status=ImageJob.STATUS_FAILED, error=str(error), finished_at=timezone.now())
+
+
+def drain_queue(max_jobs=None):
+    """Обрабатывает задания, пока очередь не опустеет. Возвращает их число."""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
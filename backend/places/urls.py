@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
-from .views import PlaceViewSet, PlaceImageViewSet, UserViewSet
+from .views import PlaceViewSet, PlaceImageViewSet, UserViewSet, ImageJobViewSet
 
 router = DefaultRouter()
 router.register(r'places', PlaceViewSet)
 router.register(r'place-images', PlaceImageViewSet)
 router.register(r'users', UserViewSet)
+router.register(r'image-jobs', ImageJobViewSet)
 
 urlpatterns = router.urls 
\ No newline at end of file
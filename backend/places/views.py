@@ -2,92 +2,167 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.shortcuts import get_object_or_404
 from django.conf import settings
+from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 import logging
 import os
-from .models import Place, PlaceImage
-from .serializers import PlaceSerializer, PlaceImageSerializer, UserSerializer
+from .models import Place, PlaceImage, ImageJob, ImageBlob, ProfileStats
+from .serializers import (
+    PlaceSerializer, PlaceImageSerializer, UserSerializer, ImageJobSerializer,
+    PlaceSearchSerializer, PlaceListSerializer,
+)
+from .tasks import queue_enabled, enqueue_image
+from .parallel import process_uploads
+from .pagination import PlaceCursorPagination, PlaceSearchPagination
+from .filters import filter_places
+from .search import search_places
+from .batch import apply_batch
+from . import conditional, fast_read, handles, response_cache
+from django.db.models import Q
 from django.http import Http404
+from django.utils import timezone
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet для пользователей (только чтение)."""
-    queryset = User.objects.all()
+    # Сводка профиля приходит тем же запросом, что и пользователь
+    queryset = User.objects.select_related('profile_stats__last_trip', 'profile_stats__cover_image')
     serializer_class = UserSerializer
     lookup_field = 'username'
 
     def get_object(self):
         """
-        Переопределяем метод для поддержки поиска пользователей
-        как по оригинальному имени, так и по отформатированному URL.
+        Пользователь по имени из URL: точному или каноническому
+        (строчные буквы, дефисы вместо пробелов) — одним запросом по индексу.
         """
         queryset = self.filter_queryset(self.get_queryset())
         lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
         lookup_value = self.kwargs[lookup_url_kwarg]
 
-        # Пробуем найти по точному совпадению
-        try:
-            obj = queryset.get(username=lookup_value)
-            return obj
-        except User.DoesNotExist:
-            # Если не нашли, пробуем найти по отформатированному имени
-            formatted_username = lookup_value.replace('-', ' ')
-            try:
-                obj = queryset.get(username__iexact=formatted_username)
-                return obj
-            except User.DoesNotExist:
-                raise Http404("Пользователь не найден")
+        obj = handles.find_user(queryset, lookup_value)
+        if obj is None:
+            raise Http404("Пользователь не найден")
+        self.check_object_permissions(self.request, obj)
+        return obj
 
 class PlaceViewSet(viewsets.ModelViewSet):
     """ViewSet для мест проживания."""
     queryset = Place.objects.all()
     serializer_class = PlaceSerializer
     lookup_field = 'slug'  # Используем slug вместо id для URL
+    pagination_class = PlaceCursorPagination
     
     def get_queryset(self):
-        """Возвращает queryset с предзагрузкой изображений."""
-        return Place.objects.all().prefetch_related('images')
+        """
+        Возвращает queryset с фильтрами списка и предзагрузкой только
+        тех изображений, которые войдут в ответ.
+        """
+        if self.action in ('retrieve', 'search'):
+            # Карточка и результаты поиска отдаются вместе с изображениями
+            return Place.objects.all().prefetch_related('images')
+        if self.action != 'list':
+            # Остальные действия изменяют изображения или читают их сами:
+            # предзагруженный заранее список был бы лишним запросом или устарел бы
+            return Place.objects.all()
+        
+        queryset = filter_places(Place.objects.all(), self.request.query_params)
+        fields = PlaceListSerializer.selected_fields(self.request.query_params)
+        if 'images' in fields:
+            queryset = queryset.prefetch_related('images')
+        if 'cover_image' in fields:
+            # Обложка хранится в самом месте: приходит тем же запросом
+            queryset = queryset.select_related('cover_image')
+        return queryset
+    
+    def get_serializer_class(self):
+        """Для списка используется компактное представление."""
+        if self.action == 'list':
+            return PlaceListSerializer
+        return super().get_serializer_class()
     
     def get_serializer_context(self):
         """Добавляем request в контекст сериализатора."""
         context = super().get_serializer_context()
         return context
     
+    def list(self, request, *args, **kwargs):
+        """Список мест: 304 для актуальной копии клиента, иначе из кэша ответов."""
+        etag, last_modified = conditional.list_validators(request, filter_places(Place.objects.all(), request.query_params))
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        
+        # Список одного владельца зависит только от его мест
+        params = request.query_params
+        if params.get('user_id'):
+            scope = f"user_id:{params['user_id']}"
+        elif params.get('username'):
+            scope = f"username:{params['username']}"
+        else:
+            scope = 'all'
+        key = response_cache.response_key('list', request, scope)
+        if getattr(settings, 'PLACES_FAST_LIST', True):
+            build = lambda: self._fast_list(request)
+        else:
+            build = lambda: super(PlaceViewSet, self).list(request, *args, **kwargs)
+        response = response_cache.cached_response(key, build)
+        return conditional.set_validators(response, etag, last_modified)
+    
+    def _fast_list(self, request):
+        """Список мест через values() без сериализаторов DRF; форма ответа та же."""
+        fields = PlaceListSerializer.selected_fields(request.query_params)
+        queryset = filter_places(Place.objects.all(), request.query_params)
+        page = self.paginate_queryset(fast_read.place_rows(queryset, fields))
+        return self.get_paginated_response(fast_read.serialize_places(page, fields, request))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Карточка места: 304 для актуальной копии клиента, иначе из кэша ответов."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        slug = self.kwargs[lookup_url_kwarg]
+        etag, last_modified = conditional.detail_validators(request, Place.objects.all(), {'slug': slug})
+        if etag is None:
+            # По slug места нет: это поиск по ID или 404, ответ не кэшируется,
+            # так как кэш карточки сбрасывается по slug
+            return super().retrieve(request, *args, **kwargs)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        
+        key = response_cache.response_key('detail', request, f"place:{slug}")
+        response = response_cache.cached_response(key, lambda: super(PlaceViewSet, self).retrieve(request, *args, **kwargs))
+        return conditional.set_validators(response, etag, last_modified)
+    
     def get_object(self):
         """
-        Переопределяем метод для поддержки как slug, так и id.
-        Сначала пытаемся найти по slug, затем по id.
+        Место по slug или числовому ID одним запросом.
+        Найденное место запоминается на время запроса: повторные вызовы
+        не обращаются к БД.
         """
-        try:
-            queryset = self.filter_queryset(self.get_queryset())
-            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
-            
-            # Получаем значение из URL
-            lookup_value = self.kwargs[lookup_url_kwarg]
-            
-            # Сначала пытаемся найти по slug
-            try:
-                obj = get_object_or_404(queryset, slug=lookup_value)
-            except:
-                # Если не нашли по slug, пробуем найти по id
-                if lookup_value.isdigit():
-                    # Если значение числовое, ищем место с таким slug
-                    obj = get_object_or_404(queryset, slug=lookup_value)
-                else:
-                    raise
-                
-            # Проверяем разрешения
-            self.check_object_permissions(self.request, obj)
-            
-            return obj
-        except Exception as e:
-            logger.error(f"Ошибка при получении объекта: {str(e)}")
-            raise
+        place = getattr(self, '_place', None)
+        if place is not None:
+            return place
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup_value = str(self.kwargs[lookup_url_kwarg])
+        
+        condition = Q(slug=lookup_value)
+        if lookup_value.isdigit():
+            condition |= Q(pk=int(lookup_value))
+        # Совпадение по slug важнее совпадения по ID
+        places = sorted(queryset.filter(condition)[:2], key=lambda place: place.slug != lookup_value)
+        if not places:
+            logger.warning(f"Место {lookup_value} не найдено")
+            raise Http404("Место не найдено")
+        
+        # Проверяем разрешения
+        self.check_object_permissions(self.request, places[0])
+        self._place = places[0]
+        return self._place
     
     def create(self, request, *args, **kwargs):
         """Создание нового места с расширенной обработкой ошибок."""
@@ -186,29 +261,79 @@ class PlaceViewSet(viewsets.ModelViewSet):
             allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
             max_size = 10 * 1024 * 1024  # 10 MB
             
-            # Создаем изображения для места
-            image_instances = []
-            for i, image_file in enumerate(images):
+            # В режиме очереди сохраняем исходники как есть,
+            # а изменение размера выполняют фоновые воркеры
+            use_queue = queue_enabled()
+            
+            # Проверяем файлы по порядку; обрабатываются только файлы до первого
+            # недопустимого, как и при последовательной загрузке
+            valid_images = []
+            error_response = None
+            for image_file in images:
                 # Проверка размера файла
                 if image_file.size > max_size:
                     logger.warning(f"Файл {image_file.name} слишком большой ({image_file.size} байт)")
-                    return Response(
+                    error_response = Response(
                         {'error': f'Файл {image_file.name} превышает максимальный размер 10 МБ.'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+                    break
                 
                 # Проверка расширения файла
                 _, ext = os.path.splitext(image_file.name.lower())
                 if ext not in allowed_extensions:
                     logger.warning(f"Недопустимый формат файла: {ext}")
-                    return Response(
+                    error_response = Response(
                         {'error': f'Формат файла {ext} не поддерживается. Разрешены только: {", ".join(allowed_extensions)}'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+                    break
                 
-                image = PlaceImage(place=place, image=image_file, order=i)
-                image.save()
-                image_instances.append(image)
+                valid_images.append(image_file)
+            
+            # Файлы, которые уже загружали раньше, не обрабатываются повторно:
+            # изображение просто сошлется на готовый блоб
+            uploads = ImageBlob.for_uploads(valid_images)
+            duplicates = [blob is not None for _, blob in uploads]
+            
+            # Без очереди обрабатываем новые файлы заранее, параллельно, если это включено
+            processed_images = [None] * len(valid_images)
+            if not use_queue:
+                fresh = [i for i, duplicate in enumerate(duplicates) if not duplicate]
+                results = process_uploads([valid_images[i] for i in fresh], PlaceImage.processing_options())
+                for i, result in zip(fresh, results):
+                    processed_images[i] = result
+            
+            # Как и при последовательной обработке, изображения до первой ошибки
+            # обработки сохраняются, а сама ошибка поднимается после их записи
+            failed = next((i for i, processed in enumerate(processed_images) if isinstance(processed, Exception)), None)
+            saved_count = len(valid_images) if failed is None else failed
+            
+            # Создаем изображения для места в исходном порядке
+            image_instances = []
+            jobs = []
+            with transaction.atomic():
+                # Место блокируется до пересчета обложки (см. Place.refresh_images)
+                Place.objects.select_for_update().filter(pk=place.pk).values_list('pk', flat=True).first()
+                for i, image_file in enumerate(valid_images[:saved_count]):
+                    if use_queue and not duplicates[i]:
+                        image = PlaceImage(place=place, image=image_file, order=i, status=PlaceImage.STATUS_PROCESSING)
+                    else:
+                        image = PlaceImage(place=place, image=image_file, order=i)
+                    # Обложку, кэш и сводку профиля пересчитываем один раз после цикла
+                    image.defer_place_refresh = True
+                    image.save(processed=processed_images[i], upload=uploads[i])
+                    jobs.append(enqueue_image(image) if image.status == PlaceImage.STATUS_PROCESSING else None)
+                    image_instances.append(image)
+                if image_instances:
+                    Place.refresh_images([place.pk], updated_at=timezone.now())
+                    response_cache.bump_versions(response_cache.place_scopes(place.slug, place.user_id, place.username))
+                    ProfileStats.apply_changes([(place.user_id, {'image_count': len(image_instances)}, ('cover_image',), ())])
+            
+            if failed is not None:
+                raise processed_images[failed]
+            if error_response is not None:
+                return error_response
             
             # Сериализуем созданные изображения
             serializer = PlaceImageSerializer(
@@ -217,6 +342,16 @@ class PlaceViewSet(viewsets.ModelViewSet):
                 context={'request': request}
             )
             
+            if use_queue:
+                # Возвращаем ID заданий, по которым клиент может опрашивать статус
+                data = serializer.data
+                # У повторно загруженных файлов задания нет: они готовы сразу
+                for item, job in zip(data, jobs):
+                    item['job_id'] = str(job.id) if job else None
+                queued = sum(1 for job in jobs if job)
+                logger.info(f"Поставлено в очередь {queued} изображений для места {place.id}")
+                return Response(data, status=status.HTTP_202_ACCEPTED)
+            
             logger.info(f"Успешно загружено {len(image_instances)} изображений для места {place.id}")
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -248,26 +383,50 @@ class PlaceViewSet(viewsets.ModelViewSet):
                 except json.JSONDecodeError:
                     image_ids = [int(id) for id in image_ids.split(',') if id.strip().isdigit()]
             
-            # Проверяем, что все ID изображений относятся к данному месту
-            images = list(PlaceImage.objects.filter(id__in=image_ids, place=place))
-            if len(images) != len(image_ids):
-                logger.warning(f"Не все изображения принадлежат месту {place.id}")
+            try:
+                image_ids = [int(image_id) for image_id in image_ids]
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'ID изображений должны быть целыми числами.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not image_ids:
+                return Response(
+                    {'error': 'Не указаны ID изображений для обновления порядка.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            positions = {image_id: order for order, image_id in enumerate(image_ids)}
+            if len(positions) != len(image_ids):
                 return Response(
-                    {'error': 'Не все указанные изображения принадлежат данному месту.'},
+                    {'error': 'ID изображений повторяются.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Обновляем порядок отображения
-            for i, image_id in enumerate(image_ids):
-                for image in images:
-                    if image.id == int(image_id):
-                        image.order = i
-                        image.save()
-                        break
+            with transaction.atomic():
+                # Место блокируется до пересчета обложки (см. Place.refresh_images)
+                Place.objects.select_for_update().filter(pk=place.pk).values_list('pk', flat=True).first()
+                # Все изображения места читаются один раз: для проверки и для ответа
+                images = list(PlaceImage.objects.select_for_update().filter(place=place))
+                if not positions.keys() <= {image.id for image in images}:
+                    logger.warning(f"Не все изображения принадлежат месту {place.id}")
+                    return Response(
+                        {'error': 'Не все указанные изображения принадлежат данному месту.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                
+                # Один UPDATE с CASE вместо сохранения каждого изображения
+                PlaceImage.reorder(place.pk, image_ids)
+                # Первое изображение могло смениться: обложку пересчитываем тем же UPDATE
+                Place.refresh_images([place.pk], updated_at=timezone.now())
+                response_cache.bump_versions(response_cache.place_scopes(place.slug, place.user_id, place.username))
+                # От порядка зависит обложка в сводке профиля
+                ProfileStats.apply_changes([(place.user_id, {}, ('cover_image',), ())])
             
-            # Возвращаем обновленные изображения
-            updated_images = PlaceImage.objects.filter(place=place).order_by('order')
-            serializer = PlaceImageSerializer(updated_images, many=True, context={'request': request})
+            # Новый порядок известен и без повторного чтения из БД
+            for image in images:
+                image.order = positions.get(image.id, image.order)
+            images.sort(key=lambda image: (image.order, image.id))
+            serializer = PlaceImageSerializer(images, many=True, context={'request': request})
             
             logger.info(f"Порядок изображений для места {place.id} успешно обновлен")
             return Response(serializer.data)
@@ -277,6 +436,47 @@ class PlaceViewSet(viewsets.ModelViewSet):
                 {"error": "Произошла ошибка при обновлении порядка изображений. Пожалуйста, попробуйте позже."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Поиск мест по параметру q с ранжированием и выделением совпадений.
+        Поддерживает те же фильтры, что и список мест.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Не указан поисковый запрос.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = filter_places(self.get_queryset(), request.query_params)
+        queryset = search_places(queryset, query)
+        
+        paginator = PlaceSearchPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = PlaceSearchSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Пакет операций create/update/delete/reorder_images в одной транзакции
+        (для воспроизведения офлайн-очереди клиента). Возвращает результат по
+        каждой операции и соответствие временных ID клиента новым slug.
+        """
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        status_code, payload = apply_batch(operations, self.get_serializer_context())
+        if status_code == status.HTTP_200_OK:
+            logger.info(f"Применен пакет из {len(operations)} операций")
+        return Response(payload, status=status_code)
+    
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """Счетчики попаданий и промахов кэша ответов."""
+        return Response(response_cache.stats())
+
+class ImageJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet для опроса статуса заданий обработки изображений."""
+    queryset = ImageJob.objects.select_related('image')
+    serializer_class = ImageJobSerializer
 
 class PlaceImageViewSet(viewsets.ModelViewSet):
     """ViewSet для изображений мест."""
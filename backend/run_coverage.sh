@@ -4,7 +4,7 @@
 pip install coverage
 
 # Запускаем тесты с покрытием кода
-coverage run --source='backend' manage.py test backend.tests
+coverage run --source='backend' manage.py test tests
 
 # Выводим отчет о покрытии в консоль
 coverage report
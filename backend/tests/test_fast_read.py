@@ -0,0 +1,66 @@
+import datetime
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from places.models import Place, PlaceImage
+
+# Наборы полей, на которых сверяются оба пути: имя -> параметры запроса
+SHAPES = {
+    'компактный': {},
+    'полный': {'expand': 'images,review,pros,cons'},
+    'выборочный': {'fields': 'id,slug,name,dates,image_count'},
+    'с обложкой': {'fields': 'id,cover_image,start_date,end_date,created_at,updated_at'},
+    'по владельцу': {'user_id': '7', 'expand': 'images'},
+}
+
+
+class FastListParityTests(APITestCase):
+    """Быстрый путь списка мест отдает тот же JSON, что и PlaceListSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        images = []
+        for i in range(6):
+            place = Place.objects.create(
+                name=f"Место {i}", location=f"Город {i}", rating=i % 5 + 1, review='Отзыв', pros='Плюсы', cons='Минусы',
+                dates='01.05.2024 – 10.05.2024' if i % 2 else '', user_id='7' if i < 3 else None, username=f"user{i}",
+            )
+            if i == 5:
+                # Место без изображений: пустой список и пустая обложка
+                continue
+            # Каждая загрузка нумерует изображения с нуля: order повторяется
+            # внутри места, и порядок должен одинаково решаться по id
+            for upload in range(2):
+                for order in range(2):
+                    name = f"places/parity_{place.pk}_{upload}_{order}.jpg"
+                    images.append(PlaceImage(
+                        place=place, image=name, order=order, width=1200, height=800, file_size=1000,
+                        placeholder='data:image/webp;base64,AAAA', orientation=1,
+                        taken_at=timezone.make_aware(datetime.datetime(2024, 5, 1, 12, order)) if upload else None,
+                        variants={'thumb': {'name': name.replace('.jpg', '_thumb.jpg'), 'width': 320, 'height': 213}},
+                    ))
+        # Файлов нет: bulk_create не запускает обработку, обложки и счетчики пересчитываем сами
+        PlaceImage.objects.bulk_create(images)
+        Place.refresh_images(Place.objects.values('pk'))
+
+    def _list(self, params, fast):
+        # Оба пути пишут в один ключ кэша ответов: сбрасываем его перед каждым запросом
+        caches['places'].clear()
+        with override_settings(PLACES_FAST_LIST=fast):
+            response = self.client.get('/api/places/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_same_json_as_serializer(self):
+        for label, params in SHAPES.items():
+            with self.subTest(label):
+                self.assertEqual(self._list(params, fast=True), self._list(params, fast=False))
+
+    def test_tied_image_order_is_resolved_by_id(self):
+        response = self.client.get('/api/places/', {'fields': 'id,images', 'expand': 'images'})
+        for place in response.data['results']:
+            keys = [(image['order'], image['id']) for image in place['images']]
+            self.assertEqual(keys, sorted(keys))
@@ -0,0 +1,73 @@
+from django.core.cache import caches
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.test import APITestCase
+
+from places.models import Place, PlaceImage
+from places.views import PlaceViewSet
+
+
+class PlaceQueryCountTests(APITestCase):
+    """Число SQL-запросов на поиск места и действия карточки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Несколько мест с одним словом в названии: поиск не должен читать изображения по месту
+        cls.places = []
+        for _ in range(3):
+            place = Place.objects.create(name='Проверка запросов')
+            PlaceImage.objects.bulk_create(
+                [PlaceImage(place=place, image=f"places/queries_{place.pk}_{order}.jpg", order=order) for order in range(3)]
+            )
+            cls.places.append(place)
+        cls.place = cls.places[0]
+
+    def setUp(self):
+        # Ответы из кэша прошлых тестов не должны обходить БД
+        for alias in ('default', 'places'):
+            caches[alias].clear()
+
+    def test_retrieve_by_slug(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/places/{self.place.slug}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_by_id(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/places/{self.place.pk}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_place(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/places/no-such-place/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_search_prefetches_images(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/places/search/', {'q': 'Проверка'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_get_object_is_memoized(self):
+        view = PlaceViewSet(
+            action='update', request=Request(RequestFactory().get('/')), format_kwarg=None,
+            kwargs={'slug': self.place.slug},
+        )
+        with self.assertNumQueries(1):
+            self.assertIs(view.get_object(), view.get_object())
+
+    def test_update_image_order(self):
+        image_ids = list(self.place.images.order_by('-order').values_list('id', flat=True))
+        # 5 запросов и SAVEPOINT/RELEASE: внутри TestCase transaction.atomic дает точку сохранения
+        with self.assertNumQueries(7):
+            response = self.client.post(
+                f"/api/places/{self.place.slug}/update_image_order/", {'image_ids': image_ids}, format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([image['id'] for image in response.data], image_ids)
+
+    def test_partial_update(self):
+        # Прежние значения места сигналы берут из снимка при загрузке, а не повторным SELECT
+        with self.assertNumQueries(3):
+            response = self.client.patch(f"/api/places/{self.place.slug}/", {'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from places.models import Place, PlaceImage, ProfileStats
+
+
+class IncrementalProfileStatsTests(TestCase):
+    """Сигналы меняют сводку профиля на разницу, и она совпадает с полным пересчетом."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='traveller')
+        self.other = User.objects.create(username='other')
+
+    def _place(self, name, rating, dates, user=None):
+        return Place.objects.create(name=name, user_id=str((user or self.user).pk), rating=rating, dates=dates)
+
+    def _image(self, place, order=0):
+        # Статус обработки: файлов нет, и сохранение не запускает обработку
+        image = PlaceImage(place=place, image=f"places/stats_{place.pk}_{order}.jpg", order=order,
+                           status=PlaceImage.STATUS_PROCESSING)
+        image.save()
+        return image
+
+    def assertMatchesCompute(self, user):
+        stats = ProfileStats.objects.get(pk=user.pk)
+        self.assertEqual({field: getattr(stats, field) for field in ProfileStats.STATS_FIELDS},
+                         ProfileStats.compute(user.pk))
+
+    def test_signals_match_full_recompute(self):
+        earlier = self._place('Раньше', 4, '01.05.2023 – 03.05.2023')
+        later = self._place('Позже', None, '01.05.2024 – 03.05.2024')
+        images = [self._image(earlier, order) for order in range(2)] + [self._image(later)]
+        self.assertMatchesCompute(self.user)
+        self.assertEqual(ProfileStats.objects.get(pk=self.user.pk).cover_image_id, images[2].pk)
+
+        later.rating = 5
+        later.save()
+        # Более поздние даты: место становится последней поездкой и дает обложку
+        earlier.dates = '01.05.2025 – 03.05.2025'
+        earlier.save()
+        self.assertMatchesCompute(self.user)
+        self.assertEqual(ProfileStats.objects.get(pk=self.user.pk).cover_image_id, images[0].pk)
+
+        images[0].delete()
+        self.assertMatchesCompute(self.user)
+
+        later.user_id = str(self.other.pk)
+        later.save()
+        self.assertMatchesCompute(self.user)
+        self.assertMatchesCompute(self.other)
+
+        Place.objects.get(pk=earlier.pk).delete()
+        self.assertMatchesCompute(self.user)
+        self.assertIsNone(ProfileStats.objects.get(pk=self.user.pk).average_rating)
+        self.assertEqual(ProfileStats.objects.get(pk=self.other.pk).average_rating, 5)
+
+    def test_place_save_does_not_reread_the_row(self):
+        place = Place.objects.get(pk=self._place('Запросы', 3, '').pk)
+        place.rating = 5
+        # UPDATE места и UPDATE сводки на разницу рейтинга
+        with self.assertNumQueries(2):
+            place.save()
+        self.assertEqual(ProfileStats.objects.get(pk=self.user.pk).average_rating, 5)
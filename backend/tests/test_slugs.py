@@ -0,0 +1,65 @@
+import threading
+
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+
+from places.models import Place
+
+
+class AllocateSlugsTests(TestCase):
+    """Подбор slug по ряду base, base-2, base-3..."""
+
+    def test_numbers_follow_the_highest_in_series(self):
+        for slug in ('hotel', 'hotel-2', 'hotel-7', 'hotel-abc', 'hotel-2-3', 'hotelx-9'):
+            Place.objects.create(name='Отель', slug=slug)
+        self.assertEqual(
+            Place.allocate_slugs(['hotel', 'hotel', 'hotel-2', 'new', 'new', 'hotelx']),
+            ['hotel-8', 'hotel-9', 'hotel-2-4', 'new', 'new-2', 'hotelx-10'],
+        )
+
+    def test_name_ending_with_number(self):
+        first = Place.objects.create(name='Комната 5')
+        second = Place.objects.create(name='Комната 5')
+        self.assertEqual((first.slug, second.slug), ('komnata-5', 'komnata-5-2'))
+
+    def test_single_query(self):
+        Place.objects.create(name='Hotel')
+        with self.assertNumQueries(1):
+            Place.allocate_slugs(['hotel', 'other'])
+
+
+class ConcurrentSlugTests(TransactionTestCase):
+    """Параллельные создания мест с одним названием получают разные slug."""
+
+    threads = 8
+    per_thread = 10
+
+    def test_concurrent_creates_get_unique_slugs(self):
+        barrier = threading.Barrier(self.threads)
+        created, errors = [], []
+        lock = threading.Lock()
+
+        def worker():
+            # Каждый поток работает через свое соединение с БД
+            try:
+                barrier.wait()
+                for _ in range(self.per_thread):
+                    place = Place.objects.create(name='Стресс')
+                    with lock:
+                        created.append(place.slug)
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        total = self.threads * self.per_thread
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(created)), total)
+        self.assertEqual(Place.objects.filter(name='Стресс').count(), total)
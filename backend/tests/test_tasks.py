@@ -0,0 +1,101 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from places import tasks
+from places.models import ImageBlob, ImageJob, Place, PlaceImage
+
+
+def _jpeg(name='photo.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 30, 30)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class RunJobTests(TestCase):
+    """Фоновая обработка изображения: исходник, блоб и повторные попытки."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Отложенные повторы не должны будить воркеры во время тестов
+        patcher = mock.patch.object(tasks, '_kick_workers_later')
+        self.kick_later = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        place = Place.objects.create(name='Очередь')
+        self.image = PlaceImage(place=place, image=_jpeg(), status=PlaceImage.STATUS_PROCESSING)
+        self.image.save()
+        self.source = self.image.image.name
+        self.job = ImageJob.objects.create(image=self.image)
+
+    def _stored(self):
+        return {
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root) for name in names
+        }
+
+    def _run(self):
+        job = tasks.claim_next_job()
+        self.assertEqual(job.pk, self.job.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.run_job(job)
+
+    def test_source_is_deleted_after_the_row_is_saved(self):
+        self._run()
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.status, PlaceImage.STATUS_READY)
+        self.assertNotIn(self.source, self._stored())
+        self.assertEqual(self._stored(), self.image.stored_files())
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.STATUS_DONE)
+
+    def test_image_deleted_while_processing_leaves_no_blob_or_files(self):
+        process = PlaceImage.process
+
+        def process_then_delete(image, *args, **kwargs):
+            process(image, *args, **kwargs)
+            PlaceImage.objects.filter(pk=image.pk).delete()
+
+        with mock.patch.object(PlaceImage, 'process', process_then_delete):
+            self._run()
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(ImageJob.objects.exists())
+        self.assertEqual(self._stored(), set())
+
+    def test_failed_attempt_keeps_source_and_backs_off(self):
+        with mock.patch('places.models.process_image', side_effect=OSError('сбой')):
+            self._run()
+        job = ImageJob.objects.get()
+        self.assertEqual(job.status, ImageJob.STATUS_PENDING)
+        self.assertGreater(job.retry_at, timezone.now() + tasks.RETRY_BACKOFF / 2)
+        self.kick_later.assert_called_once_with(tasks.RETRY_BACKOFF)
+        self.assertIn(self.source, self._stored())
+        self.assertFalse(ImageBlob.objects.exists())
+        # До истечения паузы задание не выдается воркерам
+        self.assertIsNone(tasks.claim_next_job())
+
+        # Повтор после паузы обрабатывает тот же исходник
+        ImageJob.objects.update(retry_at=timezone.now())
+        self._run()
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.status, PlaceImage.STATUS_READY)
+        self.assertNotIn(self.source, self._stored())
+
+    def test_last_attempt_marks_image_failed(self):
+        ImageJob.objects.update(attempts=tasks.MAX_ATTEMPTS - 1)
+        with mock.patch('places.models.process_image', side_effect=OSError('сбой')):
+            self._run()
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.STATUS_FAILED)
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.status, PlaceImage.STATUS_FAILED)
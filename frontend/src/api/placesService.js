@@ -5,11 +5,31 @@ import api from './config';
  */
 const placesService = {
   /**
-   * Получить список всех мест
+   * Получить список всех мест, последовательно загружая страницы по курсору
+   * @param {Object} filters - Фильтры сервера: user_id, username, rating_min, rating_max,
+   *   location, created_after, created_before
    * @returns {Promise<Array>} Массив мест
    */
-  getAllPlaces: async () => {
-    const response = await api.get('/places/');
+  getAllPlaces: async (filters = {}) => {
+    const places = [];
+    let cursor = null;
+    do {
+      const response = await api.get('/places/', { params: cursor ? { ...filters, cursor } : filters });
+      places.push(...response.data.results);
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return places;
+  },
+
+  /**
+   * Найти места по тексту с учетом опечаток и транслитерации
+   * @param {string} query - Поисковый запрос
+   * @param {Object} params - Фильтры списка мест, page и page_size
+   * @returns {Promise<Object>} Страница результатов: count, next, previous, results
+   *   (у каждого места есть rank, headline и snippet с разметкой <mark>)
+   */
+  searchPlaces: async (query, params = {}) => {
+    const response = await api.get('/places/search/', { params: { ...params, q: query } });
     return response.data;
   },
 
@@ -139,6 +159,19 @@ const placesService = {
     api.clearCacheFor('/places/');
   },
 
+  /**
+   * Применить пакет операций над местами одной транзакцией
+   * @param {Array} operations - Операции create, update, delete и reorder_images;
+   *   create передает temp_id, по которому на него ссылаются следующие операции
+   * @returns {Promise<Object>} results по каждой операции и temp_ids: temp_id -> slug
+   * @throws {Error} Если хотя бы одна операция ошибочна (ничего не применено)
+   */
+  batch: async (operations) => {
+    const response = await api.post('/places/batch/', { operations });
+    api.clearCacheFor('/places/');
+    return response.data;
+  },
+
   /**
    * Очистить весь кэш мест
    * @returns {void}
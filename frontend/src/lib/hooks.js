@@ -11,7 +11,11 @@ export function usePlaces() {
   const { data, error, isLoading, mutate } = useSWR(
     'places',
     async () => {
-      const data = await placesService.getAllPlaces();
+      // Лента показывает карусель, поэтому к компактному списку добавляем изображения
+      const data = await placesService.getAllPlaces({
+        fields: 'id,slug,name,dates,rating,location,review,created_at',
+        expand: 'images',
+      });
       
       // Преобразуем данные с сервера в формат для UI
       return data.map(place => ({
@@ -48,71 +48,82 @@ class NetworkService {
     this.syncListeners.forEach(callback => callback(isSyncing));
   }
 
+  async uploadQueuedFiles(identifier, files) {
+    const validFiles = (files || []).filter(file => file && typeof file === 'object');
+    if (validFiles.length === 0) return;
+
+    const formData = new FormData();
+    validFiles.forEach(file => {
+      formData.append('images', file);
+    });
+
+    try {
+      await placesService.uploadImages(identifier, formData);
+    } catch (uploadError) {
+      console.error('Error uploading images:', uploadError);
+      // Продолжаем выполнение, даже если загрузка изображений не удалась
+    }
+  }
+
   async processQueue() {
     if (!this.isOnline) return;
 
-    const queue = await queueService.getQueue();
+    // Отклоненные сервером операции не отправляются повторно: их данные некорректны
+    let queue = (await queueService.getQueue())
+      .filter(operation => operation.type === 'createPlace' || operation.type === 'updatePlace')
+      .filter(operation => operation.status !== 'rejected');
     if (queue.length === 0) return;
 
     this.notifySyncListeners(true);
-    
-    for (const operation of queue) {
+
+    // Все изменения мест отправляются одним пакетом: сервер применяет его целиком
+    // или не применяет вовсе, а для новых мест возвращает slug по temp_id
+    let result;
+    while (queue.length > 0) {
+      const operations = queue.map(operation => (
+        operation.type === 'createPlace'
+          ? { op: 'create', temp_id: String(operation.id), data: operation.data }
+          : { op: 'update', slug: String(operation.identifier), data: operation.data }
+      ));
+
       try {
-        if (operation.type === 'createPlace') {
-          // Создаем место
-          const newPlace = await placesService.createPlace(operation.data);
-          
-          // Если есть фотографии, загружаем их
-          if (operation.files && operation.files.length > 0) {
-            const formData = new FormData();
-            const validFiles = operation.files.filter(file => file && typeof file === 'object');
-            
-            if (validFiles.length > 0) {
-              validFiles.forEach(file => {
-                formData.append('images', file);
-              });
-              
-              const identifier = newPlace.slug || newPlace.id;
-              try {
-                await placesService.uploadImages(identifier, formData);
-              } catch (uploadError) {
-                console.error('Error uploading images:', uploadError);
-                // Продолжаем выполнение, даже если загрузка изображений не удалась
-              }
-            }
-          }
-          
-          // Удаляем операцию из очереди после успешного выполнения
-          await queueService.removeFromQueue(operation.id);
-        } else if (operation.type === 'updatePlace') {
-          const identifier = operation.identifier;
-          await placesService.updatePlace(identifier, operation.data);
-          
-          if (operation.files && operation.files.length > 0) {
-            const formData = new FormData();
-            const validFiles = operation.files.filter(file => file && typeof file === 'object');
-            
-            if (validFiles.length > 0) {
-              validFiles.forEach(file => {
-                formData.append('images', file);
-              });
-              
-              try {
-                await placesService.uploadImages(identifier, formData);
-              } catch (uploadError) {
-                console.error('Error uploading images:', uploadError);
-              }
-            }
+        result = await placesService.batch(operations);
+        break;
+      } catch (error) {
+        const results = error.response?.status === 400 ? error.response.data?.results : null;
+        const rejected = Array.isArray(results) ? results.filter(item => item.status === 400) : [];
+        if (rejected.length === 0) {
+          // Сеть или сервер недоступны: операции остаются в очереди до следующей попытки
+          console.error('Error processing queued operations:', error);
+          for (const operation of queue) {
+            await queueService.updateOperationStatus(operation.id, 'error');
           }
-          
-          await queueService.removeFromQueue(operation.id);
+          this.notifySyncListeners(false);
+          return;
         }
-      } catch (error) {
-        console.error('Error processing queued operation:', error);
-        await queueService.updateOperationStatus(operation.id, 'error');
+
+        // Пакет не применен из-за ошибочных операций (400): откладываем их,
+        // а остальные (424) сразу отправляем повторно без них
+        const rejectedIds = new Set();
+        for (const item of rejected) {
+          const operation = queue[item.index];
+          console.error(`Queued operation ${operation.id} rejected:`, item.errors);
+          await queueService.updateOperationStatus(operation.id, 'rejected');
+          rejectedIds.add(operation.id);
+        }
+        queue = queue.filter(operation => !rejectedIds.has(operation.id));
       }
     }
 
+    // Фотографии загружаются отдельно: это multipart-запросы
+    for (const operation of queue) {
+      const identifier = operation.type === 'createPlace'
+        ? result.temp_ids[String(operation.id)]
+        : operation.identifier;
+      await this.uploadQueuedFiles(identifier, operation.files);
+      await queueService.removeFromQueue(operation.id);
+    }
+
     this.notifySyncListeners(false);
   }
 }
@@ -82,10 +82,10 @@ const updateOperationStatus = async (id, status) => {
   notifyQueueListeners();
 };
 
-// Проверка наличия операций в очереди
+// Проверка наличия операций, ожидающих отправки (отклоненные сервером не ждут)
 const hasOperations = async () => {
   const queue = await getQueue();
-  return queue.length > 0;
+  return queue.some(operation => operation.status !== 'rejected');
 };
 
 const queueService = {
@@ -6,7 +6,7 @@ const usePlaces = create((set) => ({
   fetchPlaces: async () => {
     try {
       const response = await axios.get('http://127.0.0.1:8000/api/places/');
-      set({ places: response.data });
+      set({ places: response.data.results });
     } catch (error) {
       console.error('Ошибка при загрузке мест:', error);
     }